@@ -0,0 +1,130 @@
+import numpy as np
+from hand import RESOURCE_NAMES
+from game import Game, BoardState
+
+class BatchProduction:
+    """N個の独立したゲームのサイコロによる資源の取得を、配列演算でまとめて計算する
+
+    配列は対局を進める間ずっと持ち続け、建物と盗賊が変わった時だけset_building・remove_building・move_thiefで差分を反映する
+    (from_gamesで作ると、各ゲームのProductionTableの変更 (取り消しも含む) がここにも反映される)
+    """
+    RESOURCE_NUM = len(RESOURCE_NAMES)
+    BANK_LIMIT = 19
+
+    def __init__(self, hex_vertices: np.ndarray, hex_numbers: np.ndarray, hex_resources: np.ndarray, thief_pos_indexes: np.ndarray,
+                 vertex_owners: np.ndarray, vertex_multipliers: np.ndarray, resources_already_get: np.ndarray, player_num: int = Game.PLAYER_NUM):
+        # (マス, 6) : 各マスの頂点ID (全ゲームで共通)
+        self.hex_vertices = hex_vertices
+        # 頂点ID → 接するマス
+        self.vertex_hexes: list[list[int]] = [[] for _ in range(vertex_owners.shape[1])]
+        for hex_id, vertex_ids in enumerate(hex_vertices.tolist()):
+            for vertex_id in vertex_ids:
+                self.vertex_hexes[vertex_id].append(hex_id)
+        # (N, マス) : 各マスの番号と資源のインデックス (資源を生まないマスは-1)
+        self.hex_numbers = hex_numbers
+        self.hex_resources = hex_resources
+        # (N,) : 盗賊のいるマス
+        self.thief_pos_indexes = thief_pos_indexes
+        # (N, 頂点) : 建物の持ち主 (無ければ-1) と枚数 (開拓地は1、都市は2)
+        self.vertex_owners = vertex_owners
+        self.vertex_multipliers = vertex_multipliers
+        # (N, 5) : 山札から取得済みの資源カードの枚数
+        self.resources_already_get = resources_already_get
+        self.player_num = player_num
+
+        self.resource_masks = (self.hex_resources[:, :, None] == np.arange(self.RESOURCE_NUM)).astype(np.int16)
+        self.space_indexes = np.arange(self.hex_numbers.shape[1])
+        # (N, マス, プレイヤー) : 各マスが出た時にプレイヤーが受け取る枚数 (建物が変わった時に差分で更新する)
+        self.hex_multipliers = self.get_hex_multipliers()
+        # from_gamesで作った場合の、各行のゲーム
+        self.games: list[Game] = []
+
+    @classmethod
+    def from_games(cls, games: list[Game]):
+        """ゲームの今の状態から配列を作り、以降の変更が反映されるように各ゲームとつなぐ"""
+        topology = games[0].topology
+        vertex_num = len(topology.vertices)
+        hex_vertices = np.array(topology.hex_vertices, dtype=np.intp)
+        hex_numbers = np.array([game.number_by_space for game in games], dtype=np.int8)
+        hex_resources = np.array([[RESOURCE_NAMES.index(resource) if resource in RESOURCE_NAMES else -1 for resource in game.resource_by_space] for game in games], dtype=np.int8)
+        thief_pos_indexes = np.zeros(len(games), dtype=np.intp)
+        vertex_owners = np.full((len(games), vertex_num), -1, dtype=np.int8)
+        vertex_multipliers = np.zeros((len(games), vertex_num), dtype=np.int8)
+        resources_already_get = np.zeros((len(games), cls.RESOURCE_NUM), dtype=np.int16)
+        batch_production = cls(hex_vertices, hex_numbers, hex_resources, thief_pos_indexes, vertex_owners, vertex_multipliers, resources_already_get, games[0].PLAYER_NUM)
+        batch_production.games = list(games)
+        for game_index, game in enumerate(games):
+            batch_production.link_game(game_index, game)
+        return batch_production
+
+    def link_game(self, game_index: int, game: Game):
+        """この行をgameのProductionTableの内容で書き直し、以降の変更が反映されるようにする (GameState.apply_toの後にも呼ばれる)"""
+        self.vertex_owners[game_index] = -1
+        self.vertex_multipliers[game_index] = 0
+        self.hex_multipliers[game_index] = 0
+        self.thief_pos_indexes[game_index] = game.production.thief_pos_index
+        for vertex_id, (player_index, multiplier) in game.production.building_by_vertex.items():
+            self.set_building(game_index, vertex_id, player_index, multiplier)
+        self.resources_already_get[game_index] = game.resources_already_get
+        game.production.batch_row = (self, game_index)
+
+    def set_building(self, game_index: int, vertex_id: int, player_index: int, multiplier: int):
+        self.remove_building(game_index, vertex_id)
+        self.vertex_owners[game_index, vertex_id] = player_index
+        self.vertex_multipliers[game_index, vertex_id] = multiplier
+        self.hex_multipliers[game_index, self.vertex_hexes[vertex_id], player_index] += multiplier
+
+    def remove_building(self, game_index: int, vertex_id: int):
+        if (player_index := self.vertex_owners[game_index, vertex_id]) < 0:
+            return
+        self.hex_multipliers[game_index, self.vertex_hexes[vertex_id], player_index] -= self.vertex_multipliers[game_index, vertex_id]
+        self.vertex_owners[game_index, vertex_id] = -1
+        self.vertex_multipliers[game_index, vertex_id] = 0
+
+    def move_thief(self, game_index: int, thief_pos_index: int):
+        self.thief_pos_indexes[game_index] = thief_pos_index
+
+    def get_hex_multipliers(self):
+        """(N, マス, プレイヤー) : 各マスが出た時にプレイヤーが受け取る枚数 (建物の配列から全て計算し直す)"""
+        owners = self.vertex_owners[:, self.hex_vertices]
+        multipliers = self.vertex_multipliers[:, self.hex_vertices].astype(np.int16)
+        owner_masks = owners[..., None] == np.arange(self.player_num)
+        return (owner_masks * multipliers[..., None]).sum(axis=2, dtype=np.int16)
+
+    def get_resources(self, dices_results: np.ndarray, game_indexes: np.ndarray | None = None):
+        """(N,) の出目に対して、山札の枚数制限を適用した (N, プレイヤー, 5) の資源の増分を返す (7の出目は0になる)
+
+        game_indexesを指定すると、その行のゲームだけを計算する (dices_resultsはgame_indexesと同じ長さにする)
+        """
+        dices_results = np.asarray(dices_results)
+        rows = slice(None) if game_indexes is None else np.asarray(game_indexes, dtype=np.intp)
+        resources_already_get = self.resources_already_get[rows]
+        hit_masks = (self.hex_numbers[rows] == dices_results[:, None]) & (self.space_indexes != self.thief_pos_indexes[rows][:, None])
+        hit_multipliers = self.hex_multipliers[rows] * hit_masks[:, :, None]
+        resources_to_be_added = np.matmul(hit_multipliers.transpose(0, 2, 1), self.resource_masks[rows])
+
+        # Game.resolve_diceと同じく、2人以上が受け取る資源で山札が足りなければ誰も受け取れない
+        resources_to_be_added_for_all_players = resources_to_be_added.sum(axis=1)
+        receiver_nums = (resources_to_be_added > 0).sum(axis=1)
+        resources_cannot_be_added = (resources_already_get == self.BANK_LIMIT) | (
+            (resources_already_get + resources_to_be_added_for_all_players >= self.BANK_LIMIT) & (receiver_nums >= 2)
+        )
+        resources_to_be_added[np.broadcast_to(resources_cannot_be_added[:, None, :], resources_to_be_added.shape)] = 0
+        # 受け取るのが1人だけなら、山札に残っている分だけを受け取る
+        return np.minimum(resources_to_be_added, (self.BANK_LIMIT - resources_already_get)[:, None, :])
+
+def resolve_dice_batch(batch_production: BatchProduction, game_indexes: list[int], dices_results: list[int]):
+    """from_gamesで作ったbatch_productionの、サイコロを振る状態にあるゲーム (行の番号) の出目をまとめて反映する"""
+    games = batch_production.games
+    for game_index in game_indexes:
+        # 山札の残りだけは手札の操作のたびに変わるので、計算の直前に写す
+        batch_production.resources_already_get[game_index] = games[game_index].resources_already_get
+    resources_to_be_added = batch_production.get_resources(dices_results, game_indexes)
+    for game_index, dices_result, resources_to_be_added_by_player_list in zip(game_indexes, np.asarray(dices_results).tolist(), resources_to_be_added.tolist()):
+        game = games[game_index]
+        if game.crnt_state != BoardState.ROLLDICE:
+            continue
+        if dices_result == 7:
+            game.resolve_dice(dices_result)
+        else:
+            game.add_resources_by_dice(dices_result, resources_to_be_added_by_player_list)
@@ -0,0 +1,311 @@
+import argparse
+import json
+import os
+import pickle
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Callable
+
+# 画面を開かずに描画を計測する
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from game import Game, BoardState
+from longest_road import LongestRoad
+from mcts import RandomPlayer, create_player_rng
+from selfplay import play_game
+
+# 1回の計測 (repeatの1回) にかける最低限の時間 (秒)
+MIN_REPEAT_TIME = 0.05
+REPEAT_NUM = 5
+# 前回の結果より中央値がこの割合以上遅くなったら劣化とみなす
+REGRESSION_THRESHOLD = 0.10
+# 中盤の局面を作る時に進めるアクション数
+MID_GAME_STEPS = 400
+# 終盤とみなす勝利点 (誰かがこの点数に達した所で止める)
+LATE_GAME_POINT = 7
+MAX_FIXTURE_STEPS = 20000
+# マウスの位置のサンプル数
+MOUSE_POS_NUM = 64
+
+def create_fixture(seed: int, is_finished: Callable[[Game, int], bool]):
+    """シードを固定してランダムに進め、is_finishedがTrueになった次のサイコロを振る前の局面を返す"""
+    game = Game(seed)
+    player = RandomPlayer(create_player_rng(seed, 0))
+    step_num = 0
+    while game.get_winner() is None and step_num < MAX_FIXTURE_STEPS:
+        if game.crnt_state == BoardState.ROLLDICE and is_finished(game, step_num):
+            break
+        game.apply_move(player.choose_move(game))
+        step_num += 1
+    return game
+
+def create_fixtures(seed: int):
+    """序盤 (初期配置の直後)・中盤・終盤の局面"""
+    return {
+        "early": create_fixture(seed, lambda game, step_num: True),
+        "mid": create_fixture(seed, lambda game, step_num: step_num >= MID_GAME_STEPS),
+        "late": create_fixture(seed, lambda game, step_num: max(hand.get_point() for hand in game.hands) >= LATE_GAME_POINT),
+    }
+
+def copy_game(game: Game):
+    return pickle.loads(pickle.dumps(game))
+
+def measure(func: Callable[[], object], repeat_num: int = REPEAT_NUM, min_repeat_time: float = MIN_REPEAT_TIME):
+    """1回あたりの時間 (マイクロ秒) を測る (timeitと同じように、1回の計測がmin_repeat_time以上になるまで回数を増やす)"""
+    number = 1
+    while True:
+        start_time = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed_time = time.perf_counter() - start_time
+        if elapsed_time >= min_repeat_time:
+            break
+        number *= 2 if elapsed_time == 0 else max(2, min(10, int(min_repeat_time / elapsed_time) + 1))
+
+    times = [elapsed_time / number]
+    for _ in range(repeat_num - 1):
+        start_time = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start_time) / number)
+    times_us = [t * 1e6 for t in times]
+    return {
+        "median_us": statistics.median(times_us),
+        "mean_us": statistics.fmean(times_us),
+        "min_us": min(times_us),
+        "stdev_us": statistics.stdev(times_us) if len(times_us) > 1 else 0.0,
+        "number": number,
+        "repeat": repeat_num,
+    }
+
+def get_longest_road_benchmarks(fixtures: dict[str, Game]):
+    """道・開拓地を置いた時の最長経路の差分更新 (Game.get_longest_roadは更新済みの長さを比べるだけなので、置く処理を測る)"""
+    benchmarks = {}
+    for stage, game in fixtures.items():
+        game = copy_game(game)
+        longest_road = game.longest_road
+        # 各プレイヤーが道を置ける辺
+        road_candidates = [(edge, player.player_index) for player in game.player_list for edge in game.topology.get_edges(player.possible_road_mask)]
+        # 建物のない頂点のうち、誰かの道が通っている頂点に、そこに道のない他のプレイヤーが開拓地を置く (道が分断される場合)
+        settlement_candidates = []
+        for vertex in game.topology.vertices:
+            if vertex in longest_road.vertex_owner:
+                continue
+            road_players = [player_index for player_index in range(game.PLAYER_NUM) if vertex in longest_road.adjacency[player_index]]
+            if road_players and len(road_players) < game.PLAYER_NUM:
+                settlement_candidates.append((vertex, next(i for i in range(game.PLAYER_NUM) if i not in road_players)))
+
+        def add_road(longest_road: LongestRoad = longest_road, road_candidates: list = road_candidates):
+            for edge, player_index in road_candidates:
+                longest_road.add_road(edge, player_index)
+                longest_road.remove_road(edge, player_index)
+
+        def add_settlement(longest_road: LongestRoad = longest_road, settlement_candidates: list = settlement_candidates):
+            for vertex, player_index in settlement_candidates:
+                longest_road.add_settlement(vertex, player_index)
+                longest_road.remove_settlement(vertex)
+
+        # 手番のプレイヤーが道を置くアクション全体 (候補の更新と最長経路の持ち主の判定を含み、巻き戻しも含む)
+        road_edges = game.topology.get_edges(game.player_list[game.crnt_player_index].possible_road_mask)
+        def put_road(game: Game = game, road_edges: list = road_edges):
+            for edge in road_edges:
+                mark = game.get_undo_mark()
+                game.set_attr(game, "crnt_state", BoardState.SETROAD)
+                game.put_road(edge)
+                game.undo_to(mark)
+
+        # 1回の呼び出しで置いて戻す回数 (結果には1回あたりの時間も書く)
+        add_road.op_num = len(road_candidates)
+        add_settlement.op_num = len(settlement_candidates)
+        put_road.op_num = len(road_edges)
+
+        game.start_recording_undo()
+        benchmarks[f"longest_road.add_road.{stage}"] = add_road
+        benchmarks[f"longest_road.add_settlement.{stage}"] = add_settlement
+        benchmarks[f"put_road.{stage}"] = put_road
+        # 差分で更新しない、全ての頂点からの探索 (比較用)
+        benchmarks[f"get_longest_road_lengths.{stage}"] = game.get_longest_road_lengths
+    return benchmarks
+
+def get_production_benchmarks(fixtures: dict[str, Game]):
+    benchmarks = {}
+    dices_results = [n for n in range(2, 13) if n != 7]
+    for stage, game in fixtures.items():
+        game = copy_game(game)
+
+        def get_resources_by_player(game: Game = game):
+            for dices_result in dices_results:
+                game.production.get_resources_by_player(dices_result, game.PLAYER_NUM)
+
+        def resolve_dice(game: Game = game):
+            # 山札の制限と手札への反映まで含め、戻すための記録と巻き戻しも含む
+            for dices_result in dices_results:
+                mark = game.get_undo_mark()
+                game.resolve_dice(dices_result)
+                game.undo_to(mark)
+
+        game.start_recording_undo()
+        benchmarks[f"dice_production.{stage}"] = get_resources_by_player
+        benchmarks[f"resolve_dice.{stage}"] = resolve_dice
+    return benchmarks
+
+def get_delete_possible_town_pos_benchmarks(fixtures: dict[str, Game]):
+    benchmarks = {}
+    for stage, game in fixtures.items():
+        game = copy_game(game)
+        # どのプレイヤーかの候補になっている頂点 (なければ建物のない頂点) を順に消して戻す
+        possible_town_mask = 0
+        for player in game.player_list:
+            possible_town_mask |= player.possible_town_mask
+        vertices = game.topology.get_vertices(possible_town_mask)
+        if not vertices:
+            vertices = [vertex for vertex in game.topology.vertices if vertex not in game.towns_already_set and vertex not in game.cities_already_set]
+
+        def delete_possible_town_pos(game: Game = game, vertices: list[tuple[int,int]] = vertices):
+            for vertex in vertices:
+                mark = game.get_undo_mark()
+                game.delete_possible_town_pos(vertex)
+                game.undo_to(mark)
+
+        game.start_recording_undo()
+        benchmarks[f"delete_possible_town_pos.{stage}"] = delete_possible_town_pos
+    return benchmarks
+
+def get_mouse_positions(board, seed: int):
+    """半分は頂点・辺・マスの近く、残りは画面上の一様な位置"""
+    rng = random.Random(seed)
+    targets = [board.to_screen(vertex) for vertex in board.game.topology.vertices] + [board.to_screen(pos) for pos in board.game.space_pos]
+    mouse_positions = []
+    for i in range(MOUSE_POS_NUM):
+        if i % 2 == 0:
+            x, y = rng.choice(targets)
+            mouse_positions.append((int(x) + rng.randint(-10, 10), int(y) + rng.randint(-10, 10)))
+        else:
+            mouse_positions.append((rng.randrange(board.SCREEN_WIDTH), rng.randrange(board.SCREEN_HEIGHT)))
+    return mouse_positions
+
+def get_board_benchmarks(fixtures: dict[str, Game], seed: int):
+    from board import Board
+
+    benchmarks = {}
+    for stage, game in fixtures.items():
+        board = Board(copy_game(game))
+        board.game.start_recording_undo()
+        mouse_positions = get_mouse_positions(board, seed)
+
+        # 盤面の状態を候補が出る状態に切り替えて、クリックした時の処理 (当たり判定と配置) を行い、巻き戻す
+        for name, state, pick_from_mouse in (
+            ("pick_town_pos_from_mouse", BoardState.SETTOWN, board.pick_town_pos_from_mouse),
+            ("pick_city_pos_from_mouse", BoardState.SETCITY, board.pick_city_pos_from_mouse),
+            ("pick_way_pos_from_mouse", BoardState.SETROAD, board.pick_way_pos_from_mouse),
+            ("pick_thief_pos_from_mouse", BoardState.THIEF, board.pick_thief_pos_from_mouse),
+        ):
+            def pick(board: Board = board, state: BoardState = state, pick_from_mouse: Callable = pick_from_mouse):
+                game = board.game
+                for mouse_pos in mouse_positions:
+                    mark = game.get_undo_mark()
+                    game.set_attr(game, "crnt_state", state)
+                    pick_from_mouse(mouse_pos)
+                    game.undo_to(mark)
+            benchmarks[f"{name}.{stage}"] = pick
+
+        def hover(board: Board = board):
+            for mouse_pos in mouse_positions:
+                board.hover_from_mouse(mouse_pos)
+        benchmarks[f"hover_from_mouse.{stage}"] = hover
+
+        benchmarks[f"Board.draw.{stage}"] = board.draw
+
+        surface = pygame.Surface((board.SCREEN_WIDTH, board.SCREEN_HEIGHT))
+        def draw_hand_cards(board: Board = board, surface: pygame.Surface = surface):
+            for hand_card in board.hand_cards_by_player:
+                hand_card.is_dirty = True
+                hand_card.draw(surface)
+        def draw_cached_hand_cards(board: Board = board, surface: pygame.Surface = surface):
+            for hand_card in board.hand_cards_by_player:
+                hand_card.draw(surface)
+        # パネルを描き直す場合と、描いておいたパネルを貼るだけの場合
+        benchmarks[f"HandCards.draw.{stage}"] = draw_hand_cards
+        benchmarks[f"HandCards.draw_cached.{stage}"] = draw_cached_hand_cards
+    return benchmarks
+
+def get_game_benchmarks(seed: int):
+    return {"headless_game.random": lambda: play_game(seed, ["random"] * Game.PLAYER_NUM, None, None)}
+
+def get_benchmarks(seed: int):
+    fixtures = create_fixtures(seed)
+    benchmarks: dict[str, Callable[[], object]] = {}
+    benchmarks.update(get_longest_road_benchmarks(fixtures))
+    benchmarks.update(get_production_benchmarks(fixtures))
+    benchmarks.update(get_delete_possible_town_pos_benchmarks(fixtures))
+    benchmarks.update(get_board_benchmarks(fixtures, seed))
+    benchmarks.update(get_game_benchmarks(seed))
+    return benchmarks
+
+def compare_results(results: dict[str, dict], baseline: dict[str, dict], threshold: float):
+    """前回の結果と中央値を比べ、threshold以上遅くなったベンチマークの名前を返す"""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["median_us"] / baseline[name]["median_us"]
+        result["baseline_median_us"] = baseline[name]["median_us"]
+        result["ratio"] = ratio
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="シードを固定した局面で主な処理の時間を測り、JSONで保存する")
+    parser.add_argument("--seed", type=int, default=0, help="局面を作るシード")
+    parser.add_argument("--filter", default=None, help="名前にこの文字列を含むベンチマークだけを測る")
+    parser.add_argument("--repeat", type=int, default=REPEAT_NUM, help="計測の回数")
+    parser.add_argument("--output", default="benchmark_results.json", help="結果を保存するファイル")
+    parser.add_argument("--compare", default=None, help="比べる前回の結果のファイル")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="劣化とみなす中央値の増加の割合")
+    args = parser.parse_args()
+
+    benchmarks = get_benchmarks(args.seed)
+    results: dict[str, dict] = {}
+    for name, func in benchmarks.items():
+        if args.filter is not None and args.filter not in name:
+            continue
+        results[name] = measure(func, args.repeat)
+        line = f"{name:45s} {results[name]['median_us']:12.1f} us (min {results[name]['min_us']:.1f}, x{results[name]['number']})"
+        if op_num := getattr(func, "op_num", 0):
+            results[name]["op_num"] = op_num
+            results[name]["median_us_per_op"] = results[name]["median_us"] / op_num
+            line += f", {results[name]['median_us_per_op']:.1f} us/op over {op_num}"
+        print(line)
+
+    regressions = []
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare_results(results, baseline, args.threshold)
+        for name in regressions:
+            print(f"regression: {name} {results[name]['ratio']:.2f}x ({results[name]['baseline_median_us']:.1f} us -> {results[name]['median_us']:.1f} us)")
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "meta": {
+                "seed": args.seed,
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": sys.version.split()[0],
+                "pygame": pygame.version.ver,
+                "numpy": np.__version__,
+                "platform": platform.platform(),
+            },
+            "results": results,
+        }, f, indent=2)
+
+    if regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+from topology import BoardTopology, iter_bits
+
+class NetworkConnectivity:
+    """プレイヤーごとの道・船と開拓地・都市のつながりを、union-findで管理する
+
+    ノードは辺 (道・船) と頂点 (開拓地・都市) で、辺のノードは辺ID、頂点のノードは 辺の数 + 頂点ID で表す
+    他のプレイヤーの開拓地・都市がある頂点では道がつながらないので、置かれてネットワークが分断された時や、
+    道・建物を取り除いた時 (取り消し) は、そのプレイヤーの分だけ作り直す
+    """
+
+    def __init__(self, topology: BoardTopology, player_num: int):
+        self.topology = topology
+        self.player_num = player_num
+        self.edge_num = len(topology.edges)
+        node_num = self.edge_num + len(topology.vertices)
+        self.parents: list[list[int]] = [list(range(node_num)) for _ in range(player_num)]
+        # 自分の道・船がある辺と、開拓地・都市がある頂点 (ビットマスク)
+        self.edge_masks: list[int] = [0] * player_num
+        self.building_masks: list[int] = [0] * player_num
+        # 自分のネットワークから道を伸ばせる頂点 (自分の建物がある頂点と、他のプレイヤーの建物がない、自分の道の端の頂点)
+        self.reach_masks: list[int] = [0] * player_num
+
+    def find(self, player_index: int, node: int):
+        parents = self.parents[player_index]
+        while parents[node] != node:
+            # 経路を半分に縮めながら根を探す
+            parents[node] = parents[parents[node]]
+            node = parents[node]
+        return node
+
+    def union(self, player_index: int, node1: int, node2: int):
+        root1, root2 = self.find(player_index, node1), self.find(player_index, node2)
+        if root1 != root2:
+            self.parents[player_index][root2] = root1
+
+    def get_blocked_mask(self, player_index: int):
+        """他のプレイヤーの建物があって、道が通り抜けられない頂点"""
+        blocked_mask = 0
+        for other_index, building_mask in enumerate(self.building_masks):
+            if other_index != player_index:
+                blocked_mask |= building_mask
+        return blocked_mask
+
+    def add_edge(self, edge_id: int, player_index: int):
+        """道・船を加え、通り抜けられる端の頂点で、自分の他の道・船や建物とつなぐ"""
+        self.edge_masks[player_index] |= 1 << edge_id
+        blocked_mask = self.get_blocked_mask(player_index)
+        for vertex_id in self.topology.edge_vertices[edge_id]:
+            if blocked_mask >> vertex_id & 1:
+                continue
+            self.reach_masks[player_index] |= 1 << vertex_id
+            self.connect_at_vertex(player_index, vertex_id)
+
+    def add_building(self, vertex_id: int, player_index: int):
+        """開拓地を加える (都市への変更は持ち主が変わらないので呼ばなくてよい)"""
+        self.building_masks[player_index] |= 1 << vertex_id
+        self.reach_masks[player_index] |= 1 << vertex_id
+        self.connect_at_vertex(player_index, vertex_id)
+
+        # 他のプレイヤーの道がこの頂点を通っていれば、その先には伸ばせなくなり、2本以上なら分断される
+        vertex_edge_mask = self.topology.vertex_edge_masks[vertex_id]
+        for other_index in range(self.player_num):
+            if other_index == player_index or not (edge_mask := self.edge_masks[other_index] & vertex_edge_mask):
+                continue
+            if edge_mask & (edge_mask - 1):
+                self.rebuild(other_index)
+            else:
+                self.reach_masks[other_index] &= ~(1 << vertex_id)
+
+    def remove_edge(self, edge_id: int, player_index: int):
+        """add_edgeを取り消す"""
+        self.edge_masks[player_index] &= ~(1 << edge_id)
+        self.rebuild(player_index)
+
+    def remove_building(self, vertex_id: int):
+        """add_buildingを取り消す (分断されていた他のプレイヤーのネットワークがつながり直す)"""
+        vertex_bit = 1 << vertex_id
+        for player_index in range(self.player_num):
+            self.building_masks[player_index] &= ~vertex_bit
+        for player_index in range(self.player_num):
+            self.rebuild(player_index)
+
+    def connect_at_vertex(self, player_index: int, vertex_id: int):
+        """頂点に接する自分の道・船と、その頂点の自分の建物を同じ集合にする"""
+        node = self.edge_num + vertex_id if self.building_masks[player_index] >> vertex_id & 1 else None
+        for edge_id in iter_bits(self.edge_masks[player_index] & self.topology.vertex_edge_masks[vertex_id]):
+            if node is None:
+                node = edge_id
+            else:
+                self.union(player_index, node, edge_id)
+
+    def rebuild(self, player_index: int):
+        """今ある道・船と建物から、このプレイヤーの集合を作り直す"""
+        parents = self.parents[player_index]
+        for node in range(len(parents)):
+            parents[node] = node
+        blocked_mask = self.get_blocked_mask(player_index)
+        edge_mask = self.edge_masks[player_index]
+        reach_mask = self.building_masks[player_index]
+        for edge_id in iter_bits(edge_mask):
+            v1, v2 = self.topology.edge_vertices[edge_id]
+            reach_mask |= 1 << v1 | 1 << v2
+        self.reach_masks[player_index] = reach_mask & ~blocked_mask
+        for vertex_id in iter_bits(self.reach_masks[player_index]):
+            self.connect_at_vertex(player_index, vertex_id)
+
+    def is_vertex_connected(self, player_index: int, vertex_id: int):
+        """この頂点が自分のネットワークにつながっているか (ここから道を伸ばしたり、開拓地を置いたりできるか)"""
+        return bool(self.reach_masks[player_index] >> vertex_id & 1)
+
+    def is_edge_connected(self, player_index: int, edge_id: int):
+        """この辺が自分の道・船か、自分のネットワークから伸ばせる辺か"""
+        if self.edge_masks[player_index] >> edge_id & 1:
+            return True
+        v1, v2 = self.topology.edge_vertices[edge_id]
+        return bool(self.reach_masks[player_index] & (1 << v1 | 1 << v2))
+
+    def get_network(self, player_index: int, edge_id: int):
+        """この道・船と同じネットワークに属する道・船 (辺のビットマスク)"""
+        root = self.find(player_index, edge_id)
+        return sum(1 << other_id for other_id in iter_bits(self.edge_masks[player_index]) if self.find(player_index, other_id) == root)
+
+    def is_same_network(self, player_index: int, edge_id1: int, edge_id2: int):
+        return self.find(player_index, edge_id1) == self.find(player_index, edge_id2)
+
+    def get_network_num(self, player_index: int):
+        """道・船と建物からなる、互いにつながっていないネットワークの数"""
+        roots = {self.find(player_index, edge_id) for edge_id in iter_bits(self.edge_masks[player_index])}
+        roots.update(self.find(player_index, self.edge_num + vertex_id) for vertex_id in iter_bits(self.building_masks[player_index]))
+        return len(roots)
@@ -0,0 +1,80 @@
+import multiprocessing
+import pickle
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable
+from game import Game
+from mcts import MCTSPlayer
+from state import GameState
+
+def search_move(computer_player: MCTSPlayer, game: Game):
+    """ワーカーで探索し、選んだ手と探索後のプレイヤー (使い回す部分木と統計を含む) を返す"""
+    move = computer_player.choose_move(game)
+    return move, computer_player
+
+class DecisionRequest:
+    """探索中の1回分の依頼"""
+    __slots__ = ("future", "state", "start_time")
+
+    def __init__(self, future: Future, state: GameState):
+        self.future = future
+        # 依頼した時点の状態 (結果が返ってきた時に盤面が変わっていたら、その結果は使わない)
+        self.state = state
+        self.start_time = time.perf_counter()
+
+class DecisionService:
+    """コンピュータの探索を別のプロセス (またはスレッド) で行い、描画と入力の処理を止めないようにする"""
+
+    def __init__(self, max_workers: int | None = None, use_processes: bool = True):
+        self.use_processes = use_processes
+        if use_processes:
+            # 子プロセスにpygameの状態を持ち込まないように、forkではなくspawnで起動する
+            self.executor = ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            self.executor = ThreadPoolExecutor(max_workers)
+        # プレイヤーのインデックス → 探索中の依頼
+        self.requests: dict[int, DecisionRequest] = {}
+
+    def submit(self, player_index: int, computer_player: MCTSPlayer, game: Game, time_limit: float | None = None, on_done: Callable[[], None] | None = None):
+        """gameの今の状態で探索を始める (time_limitを指定すると、この1手の探索時間をそれに変える)"""
+        self.cancel(player_index)
+        if time_limit is not None:
+            computer_player.time_limit = time_limit
+        if self.use_processes:
+            future = self.executor.submit(search_move, computer_player, game)
+        else:
+            # 探索はGameをその場で動かすので、描画中のGameとは別の複製を渡す
+            future = self.executor.submit(search_move, computer_player, pickle.loads(pickle.dumps(game)))
+        if on_done is not None:
+            future.add_done_callback(lambda _: on_done())
+        self.requests[player_index] = DecisionRequest(future, GameState.from_game(game))
+
+    def is_thinking(self, player_index: int):
+        return player_index in self.requests
+
+    def get_thinking_time(self, player_index: int):
+        return time.perf_counter() - self.requests[player_index].start_time if player_index in self.requests else 0.0
+
+    def poll(self, player_index: int, game: Game):
+        """探索が終わっていれば (手, 探索後のプレイヤー) を返す (終わっていない・盤面が変わった場合はNone)"""
+        request = self.requests.get(player_index)
+        if request is None or not request.future.done():
+            return None
+        del self.requests[player_index]
+        if request.future.cancelled() or GameState.from_game(game) != request.state:
+            return None
+        # 探索中の例外はここでそのまま送り出す
+        return request.future.result()
+
+    def cancel(self, player_index: int):
+        """探索をやめる (始まる前なら取り消し、既に始まっていれば結果を捨てる)"""
+        if (request := self.requests.pop(player_index, None)) is not None:
+            request.future.cancel()
+
+    def cancel_all(self):
+        for player_index in list(self.requests):
+            self.cancel(player_index)
+
+    def shutdown(self):
+        self.cancel_all()
+        self.executor.shutdown(wait=False, cancel_futures=True)
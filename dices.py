@@ -1,14 +1,17 @@
 import pygame, random
+from text_cache import TextCache
+from font_registry import FontRegistry
 
 class Dices:
-    TIME_NUMBER_CHANGE = 30
-    TIME_NUMBER_DECIDE = 150
+    # アニメーションの時間 (ミリ秒)
+    TIME_NUMBER_CHANGE = 50
+    TIME_NUMBER_DECIDE = 250
     DICE_RED_COLOR = (255,0,0)
     DICE_BLUE_COLOR = (0,0,255)
 
-    def __init__(self, rect: pygame.Rect):
+    def __init__(self, rect: pygame.Rect, seed: int | None = None):
         self.numbers = [1,2,3,4,5,6]
-        self.font = pygame.font.SysFont("Arial", 24)
+        self.font = FontRegistry.get("Arial", 24)
         self.crnt_number_red = 1
         self.crnt_number_blue = 1
         self.rolling = False
@@ -20,7 +23,11 @@ class Dices:
         self.surface = pygame.Surface(
             (rect[2], rect[3]), pygame.SRCALPHA)
         self.timer = 0
-    
+        # 出目は盤面とは別の乱数から取る (アニメーションで引く回数が時間によって変わるため)
+        self.rng = random.Random(seed)
+        # 早送り中はアニメーションを待たずに出目を決める
+        self.is_fast_forward = False
+
     def start_dice_rolling(self, mouse_pos):
         if self.x <= mouse_pos[0] <= self.x + self.width and self.y <= mouse_pos[1] <= self.y + self.height:
             if self.rolling:
@@ -28,32 +35,49 @@ class Dices:
                 self.stopping = True
             elif not self.stopping:
                 self.rolling = True
-                self.timer = 0 
+                self.timer = 0
 
-    def draw(self, screen: pygame.Surface):
-        self.surface.fill((120,120,120))
-        # 今サイコロを回しているなら番号を変える
-        if self.rolling or self.stopping:
-            self.timer += 10
-            if self.stopping and self.timer >= self.TIME_NUMBER_DECIDE:
+    def change_numbers(self):
+        self.crnt_number_red = self.rng.choice(self.numbers)
+        self.crnt_number_blue = self.rng.choice(self.numbers)
+
+    def roll(self):
+        """アニメーションなしでサイコロを振り、出目の合計を返す"""
+        self.change_numbers()
+        self.rolling = False
+        self.stopping = False
+        self.timer = 0
+        return self.crnt_number_red + self.crnt_number_blue
+
+    def update(self, elapsed_time: int):
+        """経過時間 (ミリ秒) だけアニメーションを進め、出目が決まったらその合計を返す (決まっていなければ0)"""
+        if not (self.rolling or self.stopping):
+            return 0
+        if self.is_fast_forward:
+            return self.roll()
+
+        self.timer += elapsed_time
+        if self.stopping:
+            if self.timer >= self.TIME_NUMBER_DECIDE:
                 self.stopping = False
                 return self.crnt_number_red + self.crnt_number_blue
+        elif self.timer >= self.TIME_NUMBER_CHANGE:
+            # 遅いフレームがあっても切り替えの周期がずれないように余りを残す
+            self.timer %= self.TIME_NUMBER_CHANGE
+            self.change_numbers()
+        return 0
 
-            elif self.rolling and self.timer >= self.TIME_NUMBER_CHANGE:
-                self.timer = 0
-                self.crnt_number_red = random.choice(self.numbers)
-                self.crnt_number_blue = random.choice(self.numbers)
+    def draw(self, screen: pygame.Surface):
+        self.surface.fill((120,120,120))
 
         # 赤サイコロの描画
         pygame.draw.rect(self.surface, self.DICE_RED_COLOR, pygame.Rect(self.width//2-50,self.height//2-20,40,40))
-        dice_text_red = self.font.render(str(self.crnt_number_red), True, (255,255,255))
+        dice_text_red = TextCache.render(self.font, str(self.crnt_number_red), True, (255,255,255))
         self.surface.blit(dice_text_red, dice_text_red.get_rect(center=(self.width//2-30,self.height//2)))
         
         # 青サイコロの描画
         pygame.draw.rect(self.surface, self.DICE_BLUE_COLOR, pygame.Rect(self.width//2+10,self.height//2-20,40,40))
-        dice_text_blue = self.font.render(str(self.crnt_number_blue), True, (255,255,255))
+        dice_text_blue = TextCache.render(self.font, str(self.crnt_number_blue), True, (255,255,255))
         self.surface.blit(dice_text_blue, dice_text_blue.get_rect(center=(self.width//2+30,self.height//2)))
 
-        screen.blit(self.surface, (self.x, self.y))
-
-        return 0
\ No newline at end of file
+        screen.blit(self.surface, (self.x, self.y))
\ No newline at end of file
@@ -0,0 +1,16 @@
+import pygame
+
+class FontRegistry:
+    """(フォント名, 大きさ) ごとにフォントを1つだけ作り、プロセス全体で共有する
+
+    SysFontは呼ぶたびにフォントのファイルを探して開くので、同じ組み合わせは2回目以降ここから返す
+    (同じフォントのオブジェクトを使うことで、TextCacheのキーも揃う)
+    """
+    _fonts: dict[tuple[str, int], pygame.font.Font] = {}
+
+    @classmethod
+    def get(cls, name: str, size: int) -> pygame.font.Font:
+        key = (name, size)
+        if (font := cls._fonts.get(key)) is None:
+            font = cls._fonts[key] = pygame.font.SysFont(name, size)
+        return font
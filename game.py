@@ -0,0 +1,858 @@
+import random
+from enum import Enum
+from collections import defaultdict
+from human import HumanPlayer
+from hand import Hand, ResourceCardType, DevelopmentCardType, ActionType, UndoType, RESOURCE_NAMES
+from longest_road import LongestRoad
+from connectivity import NetworkConnectivity
+from topology import BoardTopology, iter_bits
+from production import ProductionTable
+from moves import MoveType, MOVE_STRIDE, MOVE_NUM, ReplayOp, decode_move
+
+class BoardState(Enum):
+    SETFIRSTTOWN = 0
+    SETFIRSTROAD = 1
+    SETSECONDTOWN = 2
+    SETSECONDROAD = 3
+    SETTOWN = 4
+    SETROAD = 5
+    DEVELOPROAD = 6
+    SETCITY = 7
+    TRADE = 8
+    ROLLDICE = 9
+    DISCARD = 10
+    THIEF = 11
+    STEAL = 12
+    PLENTY = 13
+    MONOPOLY = 14
+    ACTION = 15
+
+class Game:
+    """盤面の状態とルールを管理する (pygameに依存せず、アクションを直接呼び出して進められる)"""
+    VERTEX_DIR = ((0,-2),(2,-1),(2,1),(0,2),(-2,1),(-2,-1))
+    PLAYER_NUM = 4
+    WINNING_POINT = 10
+
+    def __init__(self, seed: int | None = None):
+        # 盤面の配置・略奪・交渉相手の乱数は全てこの対局用の乱数から取る (シードが同じなら同じ対局を再現できる)
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.rng = random.Random(self.seed)
+        self.space_pos = (
+            (-4,-6),(0,-6),(4,-6),
+            (-6,-3),(-2,-3),(2,-3),(6,-3),
+            (-8,0),(-4,0),(0,0),(4,0),(8,0),
+            (-6,3),(-2,3),(2,3),(6,3),
+            (-4,6),(0,6),(4,6)
+        )
+
+        self.resource_by_space, self.number_by_space, self.developments = self.set_cards_and_numbers()
+        self.vertex_details, self.edge_details = self.get_board_details()
+        # 道・船を置ける種類の辺 (辺IDのビットマスク)
+        self.road_allowed_mask = sum(1 << edge_id for edge_id, edge in enumerate(self.topology.edges) if self.edge_details[edge]["road"])
+        self.ship_allowed_mask = sum(1 << edge_id for edge_id, edge in enumerate(self.topology.edges) if self.edge_details[edge]["ship"])
+        # 全てのプレイヤーの開拓地・都市がある頂点と、道がある辺 (距離ルールと、道が置けるかの判定に使う)
+        self.built_vertex_mask = 0
+        self.built_road_mask = 0
+        # サイコロの出目ごとの資源の受け取り一覧 (開拓地・都市・盗賊の移動に合わせて更新する)
+        self.production = ProductionTable(self.topology, self.resource_by_space, self.number_by_space, self.thief_pos_index)
+
+        self.ports = {
+            ((0,-8),(-2,-7)): ("ore",0),
+            ((4,-8),(6,-7)): ("general",5),
+            ((-6,-5),(-8,-4)): ("sheep",0),
+            ((8,-4),(8,-2)): ("wheat",4),
+            ((-10,-1),(-10,1)): ("general",1),
+            ((8,2),(8,4)): ("general",4),
+            ((-8,4),(-6,5)): ("tree",2),
+            ((-2,7),(0,8)): ("brick",2),
+            ((6,7),(4,8)): ("general",3),
+        }
+
+        self.vertex_to_ports: dict[tuple[int,int], str] = {}
+        for edge, (resource, _) in self.ports.items():
+            self.vertex_to_ports[edge[0]] = resource
+            self.vertex_to_ports[edge[1]] = resource
+
+        # これらは後々HumanPlayerに設定すると思われる
+        self.ways_already_set: dict[tuple[tuple[int,int], tuple[int,int]], int] = defaultdict(int)
+        self.towns_already_set: dict[tuple[int,int], int] = defaultdict(int)
+        self.cities_already_set: dict[tuple[int,int], int] = defaultdict(int)
+
+        # 「発見」発展カードで取得する資源を管理するリスト
+        self.resources_to_get_by_plenty: list[int] = [0] * 5
+        # 今まで取得してきた「資源」カードの取得枚数を格納する
+        self.resources_already_get: list[int] = [0] * 5
+
+        self.crnt_state = BoardState.SETFIRSTTOWN
+
+        self.crnt_player_index = 0
+        self.player_list: list[HumanPlayer] = [HumanPlayer(i, self.get_first_possible_town_mask()) for i in range(self.PLAYER_NUM)]
+
+        # 名前は後で変えられるようにする
+        self.hands: tuple[Hand, ...] = tuple(Hand(f"Player {i+1}", self.resources_already_get) for i in range(self.PLAYER_NUM))
+
+        # 交渉を2度行えないように、交渉を持ちかけた時に (成立しなくても) この変数をFalseにする
+        self.is_trade_not_done: bool = True
+        # 2枚目の発展カードを使えないように、発展カードを使った時にこの変数をTrueにする
+        self.is_development_used: bool = False
+        # 最大騎士力を持っているプレイヤーと、その騎士カードの枚数
+        self.max_knight_power_player: tuple[int, int] | None = None
+        # 最長経路のプレイヤー
+        self.max_length_player: int | None = None
+        # 各プレイヤーの最長経路を差分更新で管理する
+        self.longest_road = LongestRoad(self.PLAYER_NUM)
+        # 各プレイヤーの道・船と建物のつながり (ネットワークにつながっている頂点・辺の判定に使う)
+        self.connectivity = NetworkConnectivity(self.topology, self.PLAYER_NUM)
+        # 盗賊によって資源を奪われる候補のプレイヤー
+        self.players_to_be_stolen: list[int] = []
+
+        # 探索でアクションをその場で取り消すための差分のログ (記録しない時はNone)
+        self.undo_log: list[tuple] | None = None
+        # 探索を始める前の乱数の状態とリプレイのログ (探索の後に元に戻す)
+        self.rng_state_before_search: tuple | None = None
+        self.replay_log_before_search: bytearray | None = None
+
+        # 実行したアクションを記録するリプレイのログ (記録しない時はNone、replay.pyで保存・再生する)
+        self.replay_log: bytearray | None = None
+
+    def start_recording_undo(self):
+        """これ以降のアクションの差分を記録し、undo_toで取り消せるようにする
+
+        探索の間は、乱数を進めたりリプレイに記録したりしないよう、stop_recording_undoで元に戻す
+        """
+        self.undo_log = []
+        for hand in self.hands:
+            hand.undo_log = self.undo_log
+        self.rng_state_before_search = self.rng.getstate()
+        self.replay_log_before_search, self.replay_log = self.replay_log, None
+
+    def stop_recording_undo(self):
+        self.undo_log = None
+        for hand in self.hands:
+            hand.undo_log = None
+        self.rng.setstate(self.rng_state_before_search)
+        self.replay_log = self.replay_log_before_search
+        self.rng_state_before_search = None
+        self.replay_log_before_search = None
+
+    def start_recording_replay(self):
+        self.replay_log = bytearray()
+
+    def record_replay(self, replay_op: ReplayOp, *args: int):
+        if self.replay_log is not None:
+            self.replay_log.append(replay_op)
+            self.replay_log.extend(args)
+
+    def get_undo_mark(self):
+        """現在の位置を返す (undo_toに渡すとこの時点の状態に戻る)"""
+        return len(self.undo_log)
+
+    def undo_to(self, mark: int = 0):
+        """ログを新しい順に取り出して、markの時点まで状態を戻す"""
+        undo_log = self.undo_log
+        while len(undo_log) > mark:
+            entry = undo_log.pop()
+            undo_type = entry[0]
+            if undo_type == UndoType.STATE:
+                (
+                    _, self.crnt_state, self.crnt_player_index, self.thief_pos_index, self.is_trade_not_done, self.is_development_used,
+                    self.max_knight_power_player, self.max_length_player, self.players_to_be_stolen, self.resources_to_get_by_plenty, resources_already_get
+                ) = entry
+                # 全ての手札と共有しているリストなので中身だけを戻す
+                self.resources_already_get[:] = resources_already_get
+            elif undo_type == UndoType.HAND:
+                entry[1].restore_snapshot(entry[2])
+            elif undo_type == UndoType.DICT:
+                _, dictionary, key, value = entry
+                if value is None:
+                    del dictionary[key]
+                else:
+                    dictionary[key] = value
+            elif undo_type == UndoType.ATTR:
+                setattr(entry[1], entry[2], entry[3])
+            elif undo_type == UndoType.BUILDING:
+                if entry[2] is None:
+                    self.production.remove_building(entry[1])
+                else:
+                    self.production.set_building(entry[1], *entry[2])
+            elif undo_type == UndoType.THIEF:
+                self.production.move_thief(entry[1])
+            elif undo_type == UndoType.ROAD:
+                self.longest_road.remove_road(entry[1], entry[2])
+                self.connectivity.remove_edge(self.topology.edge_ids[entry[1]], entry[2])
+            elif undo_type == UndoType.SETTLEMENT:
+                self.longest_road.remove_settlement(entry[1])
+                self.connectivity.remove_building(self.topology.vertex_ids[entry[1]])
+            elif undo_type == UndoType.DECK:
+                self.developments.insert(0, entry[1])
+
+    def record_undo(self, *entry):
+        if self.undo_log is not None:
+            self.undo_log.append(entry)
+
+    def record_state(self):
+        """アクションの最初に、ターンの進行に関わる値をまとめて記録する"""
+        if self.undo_log is not None:
+            self.undo_log.append((
+                UndoType.STATE, self.crnt_state, self.crnt_player_index, self.thief_pos_index, self.is_trade_not_done, self.is_development_used,
+                self.max_knight_power_player, self.max_length_player, self.players_to_be_stolen, self.resources_to_get_by_plenty[:], self.resources_already_get[:]
+            ))
+
+    def set_item(self, dictionary: dict, key, value):
+        self.record_undo(UndoType.DICT, dictionary, key, dictionary.get(key))
+        dictionary[key] = value
+
+    def pop_item(self, dictionary: dict, key):
+        self.record_undo(UndoType.DICT, dictionary, key, dictionary[key])
+        return dictionary.pop(key)
+
+    def set_attr(self, obj: object, name: str, value):
+        self.record_undo(UndoType.ATTR, obj, name, getattr(obj, name))
+        setattr(obj, name, value)
+
+    def set_mask(self, obj: object, name: str, mask: int):
+        """ビットマスクの属性を書き換える (変わらない場合は記録しない)"""
+        if (old_mask := getattr(obj, name)) != mask:
+            self.record_undo(UndoType.ATTR, obj, name, old_mask)
+            setattr(obj, name, mask)
+
+    def set_production_building(self, vertex_id: int, player_index: int, multiplier: int):
+        self.record_undo(UndoType.BUILDING, vertex_id, self.production.building_by_vertex.get(vertex_id))
+        self.production.set_building(vertex_id, player_index, multiplier)
+
+    def get_first_possible_town_mask(self):
+        """最初に置ける開拓地の場所を取得"""
+        return self.topology.all_vertex_mask
+
+    def set_cards_and_numbers(self):
+        """マスの資源と番号の配置を決める"""
+        resource_by_space = (
+            ["brick"]*3 + ["ore"]*3 +
+            ["tree"]*4 + ["wheat"]*4 +
+            ["sheep"]*4 + ["dessert"]
+        )
+        self.rng.shuffle(resource_by_space)
+
+        number_by_space = [2,3,3,4,4,5,5,6,6,8,8,9,9,10,10,11,11,12]
+        self.rng.shuffle(number_by_space)
+        self.thief_pos_index = resource_by_space.index("dessert")
+        number_by_space.insert(self.thief_pos_index, 0)
+
+        developments = (
+            [DevelopmentCardType.KNIGHT]*14 +
+            [DevelopmentCardType.ROAD]*2 +
+            [DevelopmentCardType.PLENTY]*2 +
+            [DevelopmentCardType.MONOPOLY]*2 +
+            [DevelopmentCardType.POINT] * 5
+        )
+        self.rng.shuffle(developments)
+
+        # developmentsはdequeにするかどうか後で決める
+        return resource_by_space, number_by_space, developments
+
+    def get_board_details(self, isSea: bool = False):
+        """頂点と辺の情報を取得する(どのマスに属しているかをインデックスを取得できるようにする)"""
+        vertex_details: defaultdict[tuple[int,int], set[int]] = defaultdict(set)
+        edge_details: defaultdict[tuple[tuple[int,int], tuple[int,int]], dict[str, bool]] = defaultdict(lambda: {"road": False, "ship": False})
+        edge_check_count: defaultdict[tuple[tuple[int,int], tuple[int,int]], int] = defaultdict(int)
+
+        for i in range(len(self.number_by_space)):
+            sx, sy = self.space_pos[i]
+            for dindex, (dx, dy) in enumerate(self.VERTEX_DIR):
+                vertex_details[(sx+dx, sy+dy)].add(i)
+                ex, ey = self.VERTEX_DIR[(dindex+1)%6]
+                edge: tuple[tuple[int,int], tuple[int,int]] = tuple(sorted(((sx+dx, sy+dy), (sx+ex, sy+ey)), key=lambda x: x[1]))
+                if self.resource_by_space[i] == "sea":
+                    edge_details[edge]["sea"] = True
+                else:
+                    edge_details[edge]["road"] = True
+                edge_check_count[edge] += 1
+
+        if isSea:
+            edge_details = {edge: {"road": edge_details[edge]["road"], "sea": True} if indexes == 1 else edge_details[edge] for edge, indexes in edge_check_count.items()}
+
+        # 配置や合法手の判定で使う隣接関係の表はここで一度だけ作る
+        self.topology = BoardTopology(self.space_pos, self.VERTEX_DIR, list(edge_check_count.keys()))
+
+        # 探索で別のプロセスに渡せるように (pickleできるように)、lambdaを持つdefaultdictは普通のdictにしておく
+        return vertex_details, dict(edge_details)
+
+    # 道を設置
+    def set_road(self, edge: tuple[tuple[int,int], tuple[int,int]], player_index: int):
+        self.set_item(self.ways_already_set, edge, player_index)
+        self.hands[player_index].add_road()
+        self.longest_road.add_road(edge, player_index)
+        edge_id = self.topology.edge_ids[edge]
+        self.connectivity.add_edge(edge_id, player_index)
+        self.record_undo(UndoType.ROAD, edge, player_index)
+        edge_bit = 1 << edge_id
+        self.set_mask(self, "built_road_mask", self.built_road_mask | edge_bit)
+        for player in self.player_list:
+            self.set_mask(player, "possible_road_mask", player.possible_road_mask & ~edge_bit)
+
+    # 開拓地を設置
+    def set_town(self, pos: tuple[int,int]):
+        self.delete_possible_town_pos(pos)
+        self.hands[self.crnt_player_index].add_town()
+        self.set_item(self.towns_already_set, pos, self.crnt_player_index)
+        vertex_id = self.topology.vertex_ids[pos]
+        self.longest_road.add_settlement(pos, self.crnt_player_index)
+        self.connectivity.add_building(vertex_id, self.crnt_player_index)
+        self.record_undo(UndoType.SETTLEMENT, pos)
+        self.set_production_building(vertex_id, self.crnt_player_index, 1)
+        self.set_mask(self, "built_vertex_mask", self.built_vertex_mask | 1 << vertex_id)
+
+    # 都市を設置
+    def set_city(self, pos: tuple[int,int]):
+        self.hands[self.crnt_player_index].change_town_to_city()
+        self.pop_item(self.towns_already_set, pos)
+        self.set_item(self.cities_already_set, pos, self.crnt_player_index)
+        self.set_production_building(self.topology.vertex_ids[pos], self.crnt_player_index, 2)
+
+    # 開拓地を置くアクション
+    def put_town(self, pos: tuple[int,int]):
+        if self.crnt_state not in (BoardState.SETTOWN, BoardState.SETFIRSTTOWN, BoardState.SETSECONDTOWN):
+            return False
+        if pos not in self.topology.vertex_ids or not self.player_list[self.crnt_player_index].possible_town_mask >> self.topology.vertex_ids[pos] & 1:
+            return False
+        self.record_state()
+        self.record_replay(ReplayOp.PUT_TOWN, self.topology.vertex_ids[pos])
+
+        if self.crnt_state == BoardState.SETTOWN:
+            self.set_town(pos)
+            self.set_board_state_to_action()
+        elif self.crnt_state == BoardState.SETSECONDTOWN:
+            self.set_second_town(pos)
+            resources_to_be_added: list[int] = [0,0,0,0,0]
+            for space_index in self.vertex_details[pos]:
+                # 砂漠・海・金脈からは資源を得られない
+                if (resource := self.resource_by_space[space_index]) in RESOURCE_NAMES:
+                    resources_to_be_added[RESOURCE_NAMES.index(resource)] += 1
+            self.hands[self.crnt_player_index].add_resources(resources_to_be_added)
+        else:
+            self.set_first_town(pos)
+        self.get_longest_road()
+        return True
+
+    # 都市を置くアクション
+    def put_city(self, pos: tuple[int,int]):
+        if self.crnt_state != BoardState.SETCITY:
+            return False
+        if self.towns_already_set.get(pos) != self.crnt_player_index:
+            return False
+        self.record_state()
+        self.record_replay(ReplayOp.PUT_CITY, self.topology.vertex_ids[pos])
+
+        self.set_city(pos)
+        self.set_board_state_to_action()
+        return True
+
+    # 道を置くアクション
+    def put_road(self, edge: tuple[tuple[int,int], tuple[int,int]]):
+        if self.crnt_state not in (BoardState.SETROAD, BoardState.SETFIRSTROAD, BoardState.SETSECONDROAD, BoardState.DEVELOPROAD):
+            return False
+        if edge not in self.topology.edge_ids or not self.player_list[self.crnt_player_index].possible_road_mask >> self.topology.edge_ids[edge] & 1:
+            return False
+        self.record_state()
+        self.record_replay(ReplayOp.PUT_ROAD, self.topology.edge_ids[edge])
+
+        self.set_road(edge, self.crnt_player_index)
+        self.update_possible_ways_from_vertex(edge[0], "road")
+        self.update_possible_ways_from_vertex(edge[1], "road")
+        if self.crnt_state == BoardState.SETFIRSTROAD:
+            if self.crnt_player_index == self.PLAYER_NUM - 1:
+                self.crnt_state = BoardState.SETSECONDTOWN
+            else:
+                self.crnt_state = BoardState.SETFIRSTTOWN
+                self.crnt_player_index += 1
+        elif self.crnt_state == BoardState.SETSECONDROAD:
+            self.set_mask(self.player_list[self.crnt_player_index], "possible_town_mask", 0)
+            self.update_possible_town_pos(edge[0])
+            self.update_possible_town_pos(edge[1])
+            if self.crnt_player_index == 0:
+                self.crnt_state = BoardState.ROLLDICE
+            else:
+                self.crnt_state = BoardState.SETSECONDTOWN
+                self.crnt_player_index -= 1
+        elif self.crnt_state == BoardState.SETROAD:
+            self.update_possible_town_pos(edge[0])
+            self.update_possible_town_pos(edge[1])
+            self.set_board_state_to_action()
+        elif self.crnt_state == BoardState.DEVELOPROAD:
+            self.update_possible_town_pos(edge[0])
+            self.update_possible_town_pos(edge[1])
+            # 2つ目の道を作れない場合はそこで街道建設を終了する
+            if not self.player_list[self.crnt_player_index].possible_road_mask | self.player_list[self.crnt_player_index].possible_ship_mask:
+                self.set_board_state_to_action()
+            else:
+                self.crnt_state = BoardState.SETROAD
+        self.get_longest_road()
+        return True
+
+    # 盗賊を移動するアクション
+    def move_thief(self, thief_pos_index: int):
+        if self.crnt_state != BoardState.THIEF or thief_pos_index == self.thief_pos_index:
+            return False
+        self.record_state()
+        self.record_replay(ReplayOp.MOVE_THIEF, thief_pos_index)
+
+        self.record_undo(UndoType.THIEF, self.thief_pos_index)
+        self.thief_pos_index = thief_pos_index
+        self.production.move_thief(thief_pos_index)
+
+        self.players_to_be_stolen = []
+        for vertex in self.topology.vertices_by_hex[thief_pos_index]:
+            if (player_index := self.towns_already_set.get(vertex)) is None:
+                player_index = self.cities_already_set.get(vertex)
+            # 資源を持っていないプレイヤーからは奪えない
+            if player_index not in (None, self.crnt_player_index) and player_index not in self.players_to_be_stolen and sum(self.hands[player_index].resources):
+                self.players_to_be_stolen.append(player_index)
+
+        if self.players_to_be_stolen:
+            self.crnt_state = BoardState.STEAL
+        else:
+            self.set_board_state_to_action()
+        return True
+
+    # サイコロの出目を反映する
+    def resolve_dice(self, dices_result: int):
+        if self.crnt_state != BoardState.ROLLDICE:
+            return False
+
+        # 7が出た場合 (7以外の出目はadd_resources_by_diceで状態を記録する)
+        if dices_result == 7:
+            self.record_state()
+            self.record_replay(ReplayOp.RESOLVE_DICE, dices_result)
+            self.crnt_state = BoardState.DISCARD if any([hand.set_resource_num_to_be_discarded() for hand in self.hands]) else BoardState.THIEF
+            return True
+
+        # 盗賊のいるマスを除いた、この出目で資源を受け取るプレイヤーだけを見る
+        resources_to_be_added_by_player_list = self.production.get_resources_by_player(dices_result, self.PLAYER_NUM)
+
+        resources_to_be_added_for_all_players = [sum(values) for values in zip(*resources_to_be_added_by_player_list)]
+        resources_cannot_be_added = [
+            self.resources_already_get[i] == 19 or
+            (
+                self.resources_already_get[i] + resources_to_be_added_for_all_players[i] >= 19
+                and sum(resource_to_be_added_by_player[i] > 0 for resource_to_be_added_by_player in resources_to_be_added_by_player_list) >= 2
+            )
+            for i in range(5)
+        ]
+
+        for i, cannot in enumerate(resources_cannot_be_added):
+            for player in resources_to_be_added_by_player_list:
+                # 受け取るのが1人だけなら、山札に残っている分だけを受け取る
+                player[i] = 0 if cannot else min(player[i], 19 - self.resources_already_get[i])
+        self.add_resources_by_dice(dices_result, resources_to_be_added_by_player_list)
+        return True
+
+    def add_resources_by_dice(self, dices_result: int, resources_to_be_added_by_player_list: list[list[int]]):
+        """山札の枚数制限を適用済みの、サイコロによる資源を各プレイヤーに配る (7以外の出目)
+
+        resolve_diceとbatch_production.resolve_dice_batchのどちらから呼ばれても、出目をリプレイに記録する
+        """
+        self.record_state()
+        self.record_replay(ReplayOp.RESOLVE_DICE, dices_result)
+        for player_index, resources_to_be_added_by_player in enumerate(resources_to_be_added_by_player_list):
+            self.hands[player_index].add_resources(resources_to_be_added_by_player)
+
+        self.set_board_state_to_action()
+
+    # 7が出た時に資源を捨てるアクション
+    def discard_resources(self, player_index: int, resources: list[int]):
+        hand = self.hands[player_index]
+        if self.crnt_state != BoardState.DISCARD or hand.resource_num_to_be_discarded == 0:
+            return False
+        if sum(resources) != hand.resource_num_to_be_discarded or any(r > n for r, n in zip(resources, hand.resources)):
+            return False
+        self.record_state()
+        self.record_replay(ReplayOp.DISCARD_RESOURCES, player_index, *resources)
+
+        hand.finish_discarding(resources)
+        # 全てのプレイヤーが資源を捨て終わったら盗賊の移動に移る
+        if all([h.resource_num_to_be_discarded == 0 for h in self.hands]):
+            self.crnt_state = BoardState.THIEF
+        return True
+
+    # 7が出た時に資源を1枚ずつ捨てるアクション
+    def discard_resource(self, player_index: int, resource_index: int):
+        hand = self.hands[player_index]
+        if self.crnt_state != BoardState.DISCARD or hand.resource_num_to_be_discarded == 0 or hand.resources[resource_index] == 0:
+            return False
+        self.record_state()
+        self.record_replay(ReplayOp.DISCARD_RESOURCE, player_index, resource_index)
+
+        hand.discard_one_resource(resource_index)
+        if all([h.resource_num_to_be_discarded == 0 for h in self.hands]):
+            self.crnt_state = BoardState.THIEF
+        return True
+
+    # 盗賊の隣のプレイヤーから資源を1枚奪うアクション
+    def steal_resource(self, player_index: int):
+        if self.crnt_state != BoardState.STEAL or player_index not in self.players_to_be_stolen:
+            return None
+        self.record_state()
+        self.record_replay(ReplayOp.STEAL_RESOURCE, player_index)
+
+        hand = self.hands[player_index]
+        resources_not_zero = [i for i, num in enumerate(hand.resources) if num != 0]
+        picked_resource = self.rng.choice(resources_not_zero)
+        resources_to_be_stolen = [0] * 5
+        resources_to_be_stolen[picked_resource] = 1
+        hand.exchange_resources([-n for n in resources_to_be_stolen])
+        self.hands[self.crnt_player_index].exchange_resources(resources_to_be_stolen)
+        self.players_to_be_stolen = []
+        self.set_board_state_to_action()
+        return picked_resource
+
+    # 「発見」で資源を1枚選ぶアクション
+    def get_resource_by_plenty(self, resource_to_get: int):
+        if self.crnt_state != BoardState.PLENTY:
+            return False
+        self.record_state()
+        self.record_replay(ReplayOp.PLENTY, resource_to_get)
+
+        self.resources_to_get_by_plenty[resource_to_get] += 1
+        if sum(self.resources_to_get_by_plenty) == 2:
+            self.resources_to_get_by_plenty = [min(19-self.resources_already_get[i], self.resources_to_get_by_plenty[i]) for i in range(5)]
+            self.hands[self.crnt_player_index].add_resources(self.resources_to_get_by_plenty)
+            self.resources_to_get_by_plenty = [0] * 5
+            self.set_board_state_to_action()
+        return True
+
+    # 「独占」で資源を選ぶアクション
+    def get_resource_by_monopoly(self, resource_to_get: int):
+        if self.crnt_state != BoardState.MONOPOLY:
+            return False
+        self.record_state()
+        self.record_replay(ReplayOp.MONOPOLY, resource_to_get)
+
+        resources_to_be_taken = [0] * 5
+        for i, hand in enumerate(self.hands):
+            if i == self.crnt_player_index or hand.resources[resource_to_get] == 0:
+                continue
+            resources_to_be_taken[resource_to_get] += hand.resources[resource_to_get]
+            hand.exchange_resources([-n if j == resource_to_get else 0 for j, n in enumerate(hand.resources)])
+        self.hands[self.crnt_player_index].exchange_resources(resources_to_be_taken)
+        self.set_board_state_to_action()
+        return True
+
+    # 交渉のアクション (成立したらTrueを返す、成立しなくてもこのターンはもう交渉できない)
+    def trade(self, resources_to_give: list[int], resources_to_take: list[int]):
+        if self.crnt_state != BoardState.TRADE:
+            return False
+        self.record_state()
+        self.record_replay(ReplayOp.TRADE, *resources_to_give, *resources_to_take)
+
+        crnt_hand = self.hands[self.crnt_player_index]
+        is_traded = False
+        if all(crnt_hand.resources[i] >= resources_to_give[i] for i in range(5)):
+            # 交渉相手は今のところランダムなプレイヤーから選ぶようにしている
+            player_index_who_can_agree_with_the_trade: list[int] = []
+            for i, hand in enumerate(self.hands):
+                if i == self.crnt_player_index:
+                    continue
+                if all([hand.resources[j] >= resources_to_take[j] for j in range(5)]):
+                    player_index_who_can_agree_with_the_trade.append(i)
+            if len(player_index_who_can_agree_with_the_trade):
+                partner_hand = self.hands[self.rng.choice(player_index_who_can_agree_with_the_trade)]
+                crnt_hand.exchange_resources([resources_to_take[i] - resources_to_give[i] for i in range(5)])
+                partner_hand.exchange_resources([resources_to_give[i] - resources_to_take[i] for i in range(5)])
+                is_traded = True
+        # 相手が見つからない交渉を何度も持ちかけて、ターンが進まなくならないようにする
+        self.is_trade_not_done = False
+        self.set_board_state_to_action()
+        return is_traded
+
+    # アクション一覧から1つを選ぶアクション
+    def select_action(self, action_type: ActionType):
+        crnt_hand = self.hands[self.crnt_player_index]
+        if self.crnt_state != BoardState.ACTION or action_type not in crnt_hand.possible_actions:
+            return False
+        self.record_state()
+        self.record_replay(ReplayOp.SELECT_ACTION, action_type)
+
+        crnt_hand.clear_possible_actions()
+        if action_type in Hand.ACTION_COSTS:
+            crnt_hand.discard_resources(Hand.ACTION_COSTS[action_type])
+
+        if action_type == ActionType.SETROAD:
+            self.crnt_state = BoardState.SETROAD
+        elif action_type == ActionType.SETTOWN:
+            self.crnt_state = BoardState.SETTOWN
+        elif action_type == ActionType.SETCITY:
+            self.crnt_state = BoardState.SETCITY
+        elif action_type == ActionType.DEVELOPMENT:
+            new_development = self.developments.pop(0)
+            self.record_undo(UndoType.DECK, new_development)
+            crnt_hand.add_development_got_now(new_development)
+            self.set_board_state_to_action()
+        elif action_type == ActionType.TRADE:
+            self.crnt_state = BoardState.TRADE
+        elif action_type == ActionType.QUIT:
+            # このターンで発展カードを取得した場合、手札に加える
+            crnt_hand.add_developments_got_now()
+            self.is_development_used = False
+            self.is_trade_not_done = True
+            self.crnt_player_index = (self.crnt_player_index + 1) % self.PLAYER_NUM
+            self.crnt_state = BoardState.ROLLDICE
+        return True
+
+    # 発展カードを使うアクション
+    def use_development(self, development_type: DevelopmentCardType):
+        crnt_hand = self.hands[self.crnt_player_index]
+        if self.crnt_state != BoardState.ACTION or self.is_development_used:
+            return False
+        if not crnt_hand.use_development(development_type):
+            return False
+        self.record_state()
+        self.record_replay(ReplayOp.USE_DEVELOPMENT, development_type)
+
+        crnt_hand.clear_possible_actions()
+        if development_type == DevelopmentCardType.KNIGHT:
+            crnt_knight_power = crnt_hand.developments_used[DevelopmentCardType.KNIGHT]
+            if self.max_knight_power_player is not None:
+                if crnt_knight_power > self.max_knight_power_player[1]:
+                    self.hands[self.max_knight_power_player[0]].set_max_knight_power(False)
+                    crnt_hand.set_max_knight_power(True)
+                    self.max_knight_power_player = (self.crnt_player_index, crnt_knight_power)
+            elif crnt_knight_power == 3:
+                crnt_hand.set_max_knight_power(True)
+                self.max_knight_power_player = (self.crnt_player_index, crnt_knight_power)
+            self.crnt_state = BoardState.THIEF
+        elif development_type == DevelopmentCardType.ROAD:
+            # 使っても道を配置できない状況なら無効となる
+            if self.player_list[self.crnt_player_index].possible_road_mask | self.player_list[self.crnt_player_index].possible_ship_mask:
+                self.crnt_state = BoardState.DEVELOPROAD
+            else:
+                self.set_board_state_to_action()
+        elif development_type == DevelopmentCardType.PLENTY:
+            self.crnt_state = BoardState.PLENTY
+        # development_type == DevelopmentCardType.MONOPOLY
+        else:
+            self.crnt_state = BoardState.MONOPOLY
+
+        self.is_development_used = True
+        return True
+
+    def get_winner(self):
+        """勝利点に達したプレイヤー (いなければNone)"""
+        for player_index, hand in enumerate(self.hands):
+            if hand.get_point() >= self.WINNING_POINT:
+                return player_index
+        return None
+
+    def get_moving_player(self):
+        """次のアクションを選ぶプレイヤー (資源を捨てる時は、まだ捨て終わっていない最初のプレイヤー)"""
+        if self.crnt_state == BoardState.DISCARD:
+            for player_index, hand in enumerate(self.hands):
+                if hand.resource_num_to_be_discarded:
+                    return player_index
+        return self.crnt_player_index
+
+    def get_legal_moves(self):
+        """現在の状態で選べる全てのアクションを、整数で表したリストで返す (moves.pyを参照)"""
+        state = self.crnt_state
+        crnt_player = self.player_list[self.crnt_player_index]
+        crnt_hand = self.hands[self.crnt_player_index]
+        if state in (BoardState.SETFIRSTTOWN, BoardState.SETSECONDTOWN, BoardState.SETTOWN):
+            offset = MoveType.PLACE_TOWN * MOVE_STRIDE
+            return [offset + vertex_id for vertex_id in iter_bits(crnt_player.possible_town_mask)]
+        if state in (BoardState.SETFIRSTROAD, BoardState.SETSECONDROAD, BoardState.SETROAD, BoardState.DEVELOPROAD):
+            offset = MoveType.PLACE_ROAD * MOVE_STRIDE
+            return [offset + edge_id for edge_id in iter_bits(crnt_player.possible_road_mask)]
+        if state == BoardState.SETCITY:
+            offset = MoveType.PLACE_CITY * MOVE_STRIDE
+            vertex_ids = self.topology.vertex_ids
+            return [offset + vertex_ids[vertex] for vertex, player_index in self.towns_already_set.items() if player_index == self.crnt_player_index]
+        if state == BoardState.ROLLDICE:
+            offset = MoveType.ROLL * MOVE_STRIDE
+            return [offset + dices_result for dices_result in range(2, 13)]
+        if state == BoardState.DISCARD:
+            player_index = self.get_moving_player()
+            offset = MoveType.DISCARD * MOVE_STRIDE + player_index * 5
+            return [offset + i for i, n in enumerate(self.hands[player_index].resources) if n]
+        if state == BoardState.THIEF:
+            offset = MoveType.MOVE_THIEF * MOVE_STRIDE
+            return [offset + i for i in range(len(self.space_pos)) if i != self.thief_pos_index]
+        if state == BoardState.STEAL:
+            offset = MoveType.STEAL * MOVE_STRIDE
+            return [offset + player_index for player_index in self.players_to_be_stolen]
+        if state in (BoardState.PLENTY, BoardState.MONOPOLY):
+            offset = (MoveType.PLENTY if state == BoardState.PLENTY else MoveType.MONOPOLY) * MOVE_STRIDE
+            return [offset + i for i in range(5)]
+        if state == BoardState.TRADE:
+            offset = MoveType.TRADE * MOVE_STRIDE
+            return [offset + give * 5 + take for give, n in enumerate(crnt_hand.resources) if n for take in range(5) if take != give]
+        # state == BoardState.ACTION
+        offset = MoveType.SELECT_ACTION * MOVE_STRIDE
+        moves = [offset + action_type for action_type in crnt_hand.possible_actions]
+        if not self.is_development_used:
+            offset = MoveType.USE_DEVELOPMENT * MOVE_STRIDE
+            moves.extend(offset + development_type for development_type in range(DevelopmentCardType.POINT) if crnt_hand.developments[development_type])
+        return moves
+
+    def get_legal_move_mask(self):
+        """選べるアクションの位置だけが1になる、長さMOVE_NUMのマスク"""
+        mask = bytearray(MOVE_NUM)
+        for move in self.get_legal_moves():
+            mask[move] = 1
+        return mask
+
+    def apply_move(self, move: int):
+        """整数で表したアクションを実行する (実行できればTrueを返す)"""
+        move_type, arg = decode_move(move)
+        if move_type == MoveType.PLACE_TOWN:
+            return self.put_town(self.topology.vertices[arg])
+        if move_type == MoveType.PLACE_ROAD:
+            return self.put_road(self.topology.edges[arg])
+        if move_type == MoveType.PLACE_CITY:
+            return self.put_city(self.topology.vertices[arg])
+        if move_type == MoveType.MOVE_THIEF:
+            return self.move_thief(arg)
+        if move_type == MoveType.STEAL:
+            return self.steal_resource(arg) is not None
+        if move_type == MoveType.PLENTY:
+            return self.get_resource_by_plenty(arg)
+        if move_type == MoveType.MONOPOLY:
+            return self.get_resource_by_monopoly(arg)
+        if move_type == MoveType.DISCARD:
+            return self.discard_resource(*divmod(arg, 5))
+        if move_type == MoveType.SELECT_ACTION:
+            return self.select_action(ActionType(arg))
+        if move_type == MoveType.USE_DEVELOPMENT:
+            return self.use_development(DevelopmentCardType(arg))
+        if move_type == MoveType.TRADE:
+            if self.crnt_state != BoardState.TRADE:
+                return False
+            # 相手が見つからず成立しなくても、交渉は終わってアクションの選択に戻る (1枚と1枚の交渉だけ)
+            give, take = divmod(arg, 5)
+            self.trade([int(i == give) for i in range(5)], [int(i == take) for i in range(5)])
+            return True
+        # move_type == MoveType.ROLL
+        return self.resolve_dice(arg)
+
+    def delete_possible_town_pos(self, vertex: tuple[int,int]):
+        topology = self.topology
+        vertex_id = topology.vertex_ids[vertex]
+        block_mask = topology.vertex_block_masks[vertex_id]
+        vertex_edge_mask = topology.vertex_edge_masks[vertex_id]
+
+        for player in self.player_list:
+            if player.player_index != self.crnt_player_index and (possible_road_mask := player.possible_road_mask & vertex_edge_mask):
+                # この頂点を通って伸ばす予定だった道は、反対側の頂点から伸ばせる場合のみ残す
+                for edge_id in iter_bits(possible_road_mask):
+                    v1, v2 = topology.edge_vertices[edge_id]
+                    if not self.connectivity.is_vertex_connected(player.player_index, v2 if v1 == vertex_id else v1):
+                        self.set_mask(player, "possible_road_mask", player.possible_road_mask & ~(1 << edge_id))
+
+            self.set_mask(player, "possible_town_mask", player.possible_town_mask & ~block_mask)
+
+    def set_first_town(self, best_pos: tuple[int,int]):
+        self.set_town(best_pos)
+        self.update_possible_ways_from_vertex(best_pos, "town")
+        self.crnt_state = BoardState.SETFIRSTROAD
+
+    def set_second_town(self, best_pos: tuple[int,int]):
+        self.set_town(best_pos)
+        self.update_possible_ways_from_vertex(best_pos, "town")
+        self.crnt_state = BoardState.SETSECONDROAD
+
+    def update_possible_town_pos(self, vertex: tuple[int,int]):
+        """現在設置した道に含まれる座標について、その座標と隣り合う座標全てで開拓地または都市がないなら、開拓地を置ける場所候補として登録する"""
+        vertex_id = self.topology.vertex_ids[vertex]
+        if self.built_vertex_mask & self.topology.vertex_block_masks[vertex_id]:
+            return
+
+        player = self.player_list[self.crnt_player_index]
+        self.set_mask(player, "possible_town_mask", player.possible_town_mask | 1 << vertex_id)
+
+    def update_possible_ways_from_vertex(self, vertex: tuple[int,int], object_type: str):
+        """現在設置した道または開拓地から道を伸ばせる辺を新たに取得する"""
+        # 先端に自分以外の開拓地・都市がある場合は伸ばせない
+        if self.towns_already_set.get(vertex, self.cities_already_set.get(vertex)) not in (None, self.crnt_player_index):
+            return
+
+        # まだそこに道が置かれていない辺を見る(後々、海賊で規制されていないかも確認できるようにする)
+        free_edge_mask = self.topology.vertex_edge_masks[self.topology.vertex_ids[vertex]] & ~self.built_road_mask
+        player = self.player_list[self.crnt_player_index]
+        # 道が置ける辺であり、前置いたのが船ではない場合は道を置ける
+        if object_type != "ship":
+            self.set_mask(player, "possible_road_mask", player.possible_road_mask | free_edge_mask & self.road_allowed_mask)
+        # 船が置ける辺であり、前置いたのが道ではない場合は船を置ける
+        if object_type != "town":
+            self.set_mask(player, "possible_ship_mask", player.possible_ship_mask | free_edge_mask & self.ship_allowed_mask)
+
+    def set_board_state_to_action(self):
+        self.crnt_state = BoardState.ACTION
+        self.hands[self.crnt_player_index].set_possible_action(
+            self.player_list[self.crnt_player_index].possible_road_mask != 0,
+            self.player_list[self.crnt_player_index].possible_ship_mask != 0,
+            self.player_list[self.crnt_player_index].possible_town_mask != 0,
+            len(self.developments) != 0,
+            self.is_trade_not_done
+            )
+
+    def get_longest_road(self):
+        max_length_list = self.longest_road.lengths
+
+        max_length = max(max_length_list)
+        if max_length < 5:
+            if self.max_length_player is not None:
+                self.hands[self.max_length_player].set_max_length(False)
+                self.max_length_player = None
+            return
+
+        max_length_player_index = [i for i, l in enumerate(max_length_list) if l == max_length]
+        if self.max_length_player in max_length_player_index:
+            return
+
+        if self.max_length_player is not None:
+            self.hands[self.max_length_player].set_max_length(False)
+        # 今のプレイヤーが最長なら優先し、そうでなければ単独で最長のプレイヤーに移る (同点なら誰も持たない)
+        if self.crnt_player_index in max_length_player_index:
+            self.max_length_player = self.crnt_player_index
+        elif len(max_length_player_index) == 1:
+            self.max_length_player = max_length_player_index[0]
+        else:
+            self.max_length_player = None
+        if self.max_length_player is not None:
+            self.hands[self.max_length_player].set_max_length(True)
+
+    def get_longest_road_lengths(self):
+        """全ての頂点から探索して最長経路を求める (LongestRoadの結果の検証用)"""
+        vertices_list: list[set[tuple[int,int]]] = [set() for _ in range(self.PLAYER_NUM)]
+        ways_list: list[set[tuple[tuple[int,int],tuple[int,int]]]] = [set() for _ in range(self.PLAYER_NUM)]
+        for edge, player_index in self.ways_already_set.items():
+            v1, v2 = edge
+            ways_list[player_index].add(edge)
+            vertices_list[player_index].add(v1)
+            vertices_list[player_index].add(v2)
+
+        max_length_list = [0] * self.PLAYER_NUM
+        for player_index, vertices in enumerate(vertices_list):
+            for v in vertices:
+                length = self.longest_path_from(v, ways_list[player_index], set(), player_index)
+                max_length_list[player_index] = max(max_length_list[player_index], length)
+        return max_length_list
+
+    def longest_path_from(self, vertex: tuple[int,int], ways: set[tuple[tuple[int,int],tuple[int,int]]], visited_edges: set[tuple[tuple[int,int],tuple[int,int]]], player_index: int):
+        max_length = 0
+
+        for edge in ways:
+            if edge not in visited_edges and vertex in edge:
+                next_vertex = edge[1] if edge[0] == vertex else edge[0]
+                # 他プレイヤーの開拓地または都市がある頂点で道は途切れる
+                if (self.towns_already_set.get(next_vertex) in (None, player_index)
+                    and self.cities_already_set.get(next_vertex) in (None, player_index)):
+                    length = 1 + self.longest_path_from(
+                        next_vertex,
+                        ways,
+                        visited_edges | {edge},
+                        player_index
+                    )
+                else:
+                    length = 1
+                max_length = max(max_length, length)
+
+        return max_length
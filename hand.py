@@ -0,0 +1,216 @@
+from enum import IntEnum
+
+class ResourceCardType(IntEnum):
+    TREE = 0
+    BRICK = 1
+    SHEEP = 2
+    WHEAT = 3
+    ORE = 4
+
+# ResourceCardTypeの順に並べた資源名 (盤面のマスの資源名から手札のインデックスを引くのに使う)
+RESOURCE_NAMES = ("tree", "brick", "sheep", "wheat", "ore")
+
+class DevelopmentCardType(IntEnum):
+    KNIGHT = 0
+    ROAD = 1
+    PLENTY = 2
+    MONOPOLY = 3
+    POINT = 4
+
+class ActionType(IntEnum):
+    SETROAD = 0
+    SETTOWN = 1
+    SETCITY = 2
+    DEVELOPMENT = 3
+    TRADE = 4
+    QUIT = 5
+
+class UndoType(IntEnum):
+    """Gameの取り消しのログに積む差分の種類"""
+    STATE = 0
+    HAND = 1
+    DICT = 2
+    ATTR = 3
+    BUILDING = 4
+    THIEF = 5
+    ROAD = 6
+    SETTLEMENT = 7
+    DECK = 8
+
+class Hand:
+    """プレイヤーの手札の状態 (描画には依存しない)"""
+    ACTION_COSTS = {
+        ActionType.SETROAD: (1,1,0,0,0),
+        ActionType.SETTOWN: (1,1,1,1,0),
+        ActionType.SETCITY: (0,0,0,2,3),
+        ActionType.DEVELOPMENT: (0,0,1,1,1),
+    }
+
+    def __init__(self, player_name: str, resources_already_get: list[int]):
+        self.player_name = player_name
+        self.resources = [0] * 5
+        # 全プレイヤーで共有する、山札から取得済みの資源カードの枚数
+        self.resources_already_get = resources_already_get
+        self.developments = [0] * 5
+        self.developments_got_now = [0] * 5
+        self.developments_used = [0] * 5
+
+        self.is_max_knight_power = False
+        self.is_max_length = False
+
+        self.road_count = 0
+        self.ship_count = 0
+        self.town_count = 0
+        self.city_count = 0
+
+        self.resource_num_to_be_discarded: int = 0
+        # 現在選択できるアクション
+        self.possible_actions: list[ActionType] = []
+
+        # 表示を描き直す必要があるかを判断するため、状態を変えるたびに増やす
+        self.version: int = 0
+        # Gameが取り消しを記録している間は、そのログと共有する (記録しない時はNone)
+        self.undo_log: list[tuple] | None = None
+
+    def update_version(self):
+        self.version += 1
+
+    def record_undo(self):
+        """状態を変える前に、元に戻すための値を取り消しのログに積む"""
+        if self.undo_log is not None:
+            self.undo_log.append((UndoType.HAND, self, self.get_snapshot()))
+
+    def get_snapshot(self):
+        # 値を入れ替えて更新するリストはそのまま、要素を書き換えるリストはコピーして持つ
+        return (
+            self.resources, self.developments[:], self.developments_got_now[:], self.developments_used[:],
+            self.is_max_knight_power, self.is_max_length,
+            self.road_count, self.ship_count, self.town_count, self.city_count,
+            self.resource_num_to_be_discarded, self.possible_actions
+        )
+
+    def restore_snapshot(self, snapshot: tuple):
+        (
+            self.resources, self.developments, self.developments_got_now, self.developments_used,
+            self.is_max_knight_power, self.is_max_length,
+            self.road_count, self.ship_count, self.town_count, self.city_count,
+            self.resource_num_to_be_discarded, self.possible_actions
+        ) = snapshot
+        # 描画済みの番号と重ならないように、戻した時も番号は進める
+        self.update_version()
+
+    def get_point(self):
+        return self.town_count + self.city_count * 2 + self.developments[DevelopmentCardType.POINT] + self.is_max_knight_power * 2 + self.is_max_length * 2
+
+    # 今のところは船建設は考えない
+    def set_possible_action(self, is_able_to_set_road: bool, is_able_to_set_ship: bool, is_able_to_set_town: bool, is_able_to_pick_development: bool, is_trade_not_done: bool):
+        self.record_undo()
+        self.possible_actions = []
+        # 街道建設
+        if self.resources[ResourceCardType.TREE] >= 1 and self.resources[ResourceCardType.BRICK] >= 1 and is_able_to_set_road and self.road_count < 15:
+            self.possible_actions.append(ActionType.SETROAD)
+        # 開拓地建設
+        if self.resources[ResourceCardType.TREE] >= 1 and self.resources[ResourceCardType.BRICK] >= 1 and self.resources[ResourceCardType.SHEEP] >= 1 and self.resources[ResourceCardType.WHEAT] >= 1 and self.town_count != 5 and is_able_to_set_town:
+            self.possible_actions.append(ActionType.SETTOWN)
+        # 都市化
+        if self.resources[ResourceCardType.WHEAT] >= 2 and self.resources[ResourceCardType.ORE] >= 3 and self.town_count >= 1 and self.city_count < 5:
+            self.possible_actions.append(ActionType.SETCITY)
+        # 発展
+        if self.resources[ResourceCardType.SHEEP] >= 1 and self.resources[ResourceCardType.WHEAT] >= 1 and self.resources[ResourceCardType.ORE] >= 1 and is_able_to_pick_development:
+            self.possible_actions.append(ActionType.DEVELOPMENT)
+        # 交渉 (現在何かしらの資源カードを持っているなら実行できる)
+        if sum(self.resources) and is_trade_not_done:
+            self.possible_actions.append(ActionType.TRADE)
+        self.possible_actions.append(ActionType.QUIT)
+        self.update_version()
+
+    def clear_possible_actions(self):
+        self.record_undo()
+        self.possible_actions = []
+        self.update_version()
+
+    def add_resources(self, resources_to_be_added: list[int]):
+        self.record_undo()
+        self.resources_already_get[:] = [i+j for i, j in zip(self.resources_already_get, resources_to_be_added)]
+        self.resources = [i+j for i, j in zip(self.resources, resources_to_be_added)]
+        self.update_version()
+
+    def discard_resources(self, resources_to_be_discard: list[int]):
+        self.record_undo()
+        self.resources_already_get[:] = [i-j for i, j in zip(self.resources_already_get, resources_to_be_discard)]
+        self.resources = [i-j for i, j in zip(self.resources, resources_to_be_discard)]
+        self.update_version()
+
+    def exchange_resources(self, resources_to_be_changed: list[int]):
+        """プレイヤー間で資源をやり取りする (山札の枚数は変わらない)"""
+        self.record_undo()
+        self.resources = [i+j for i, j in zip(self.resources, resources_to_be_changed)]
+        self.update_version()
+
+    def set_resource_num_to_be_discarded(self):
+        self.record_undo()
+        self.resource_num_to_be_discarded = sum(self.resources) // 2 if sum(self.resources) >= 8 else 0
+        self.update_version()
+        return self.resource_num_to_be_discarded
+
+    def finish_discarding(self, resources_to_be_discard: list[int]):
+        self.record_undo()
+        self.resource_num_to_be_discarded = 0
+        self.discard_resources(resources_to_be_discard)
+
+    def discard_one_resource(self, resource_index: int):
+        """捨てる枚数のうち1枚だけを捨てる"""
+        self.record_undo()
+        self.resource_num_to_be_discarded -= 1
+        self.resources_already_get[resource_index] -= 1
+        self.resources = [n - (i == resource_index) for i, n in enumerate(self.resources)]
+        self.update_version()
+
+    def add_road(self):
+        self.record_undo()
+        self.road_count += 1
+        self.update_version()
+
+    def add_town(self):
+        self.record_undo()
+        self.town_count += 1
+        self.update_version()
+
+    def change_town_to_city(self):
+        self.record_undo()
+        self.town_count -= 1
+        self.city_count += 1
+        self.update_version()
+
+    def set_max_knight_power(self, is_max_knight_power: bool):
+        self.record_undo()
+        self.is_max_knight_power = is_max_knight_power
+        self.update_version()
+
+    def set_max_length(self, is_max_length: bool):
+        self.record_undo()
+        self.is_max_length = is_max_length
+        self.update_version()
+
+    def use_development(self, development_type: int):
+        """発展カードを1枚使う (得点カードは使えない)"""
+        if development_type == DevelopmentCardType.POINT or self.developments[development_type] == 0:
+            return False
+        self.record_undo()
+        self.developments[development_type] -= 1
+        self.developments_used[development_type] += 1
+        self.update_version()
+        return True
+
+    def add_development_got_now(self, development_type: int):
+        self.record_undo()
+        self.developments_got_now[development_type] += 1
+        self.update_version()
+
+    def add_developments_got_now(self):
+        """このターンで取得した発展カードを手札に加える"""
+        if sum(self.developments_got_now):
+            self.record_undo()
+            self.developments = [self.developments[i] + self.developments_got_now[i] for i in range(5)]
+            self.developments_got_now = [0] * 5
+            self.update_version()
@@ -1,9 +1,7 @@
-import math
-import numpy as np
-
 class HumanPlayer:
-    def __init__(self, player_index: int, possible_town_pos: set[tuple[int, int]]):
-        self.possible_town_pos = possible_town_pos
-        self.possible_road_pos: set[tuple[tuple[int,int], tuple[int,int]]] = set()
-        self.possible_ship_pos: set[tuple[tuple[int,int], tuple[int,int]]] = set()
+    def __init__(self, player_index: int, possible_town_mask: int):
+        # 開拓地・道・船を置ける場所の候補 (頂点ID・辺IDのビットマスク)
+        self.possible_town_mask = possible_town_mask
+        self.possible_road_mask = 0
+        self.possible_ship_mask = 0
         self.player_index = player_index
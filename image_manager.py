@@ -1,12 +1,92 @@
 import os
 import pygame
 
+# 実行する場所によらず、このファイルの隣のimagesを読む
+IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
+
 class ImageManager:
+    """images/*.pngを1枚のアトラスに詰めて一度だけ読み込み、画像を整数のハンドルで引けるようにする
+
+    描画では ImageManager.blit(surface, handle, center) のように、アトラスの該当する範囲だけを貼り付ける
+    (最初に使った時にPNGを読み込んでフレームが止まることや、毎フレーム名前の文字列を作って辞書を引くことがないようにする)
+    """
+    # 画像同士の間に空ける隙間 (ピクセル)
+    PADDING = 1
+    # アトラスの幅の上限 (これを超えたら次の段に詰める)
+    MAX_ATLAS_WIDTH = 512
+
+    _atlas: pygame.Surface | None = None
+    _is_converted: bool = False
+    # ハンドル → アトラス上の範囲
+    _rects: list[pygame.Rect] = []
+    # 画像の名前 → ハンドル
+    _handles: dict[str, int] = {}
+    # load()で返す、アトラスを共有するサブサーフェス
     _cache: dict[str, pygame.Surface] = {}
 
+    @classmethod
+    def preload(cls):
+        """アトラスを作る (画面を作った後に呼べば、画面のピクセル形式に変換もする)"""
+        if cls._atlas is None:
+            cls.build_atlas()
+        if not cls._is_converted and pygame.display.get_surface() is not None:
+            cls._atlas = cls._atlas.convert_alpha()
+            cls._is_converted = True
+            cls._cache.clear()
+
+    @classmethod
+    def build_atlas(cls):
+        names = sorted(file_name[:-4] for file_name in os.listdir(IMAGE_DIR) if file_name.endswith(".png"))
+        images = {name: pygame.image.load(os.path.join(IMAGE_DIR, f"{name}.png")) for name in names}
+
+        # 高さの順に並べ、左から段 (shelf) に詰めていく
+        rects = {}
+        x = y = shelf_height = atlas_width = 0
+        for name in sorted(names, key=lambda name: (-images[name].get_height(), name)):
+            width, height = images[name].get_size()
+            if x > 0 and x + width > cls.MAX_ATLAS_WIDTH:
+                x, y = 0, y + shelf_height + cls.PADDING
+                shelf_height = 0
+            rects[name] = pygame.Rect(x, y, width, height)
+            x += width + cls.PADDING
+            shelf_height = max(shelf_height, height)
+            atlas_width = max(atlas_width, x)
+
+        atlas = pygame.Surface((max(1, atlas_width), max(1, y + shelf_height)), pygame.SRCALPHA)
+        atlas.fill((0, 0, 0, 0))
+        for name, rect in rects.items():
+            # 透明なアトラスとアルファ合成すると半透明の色が変わるので、そのまま写す
+            atlas.blit(images[name], rect, special_flags=pygame.BLEND_RGBA_MAX)
+
+        cls._atlas = atlas
+        cls._is_converted = False
+        cls._rects = [rects[name] for name in names]
+        cls._handles = {name: handle for handle, name in enumerate(names)}
+        cls._cache.clear()
+
+    @classmethod
+    def get_handle(cls, name: str) -> int:
+        if cls._atlas is None:
+            cls.preload()
+        return cls._handles[name]
+
+    @classmethod
+    def get_rect(cls, handle: int) -> pygame.Rect:
+        """画像の大きさの矩形 (左上が(0,0))"""
+        return pygame.Rect(0, 0, cls._rects[handle].width, cls._rects[handle].height)
+
+    @classmethod
+    def blit(cls, surface: pygame.Surface, handle: int, center: tuple[float, float]):
+        """画像を、中心がcenterになるように貼り付ける"""
+        area = cls._rects[handle]
+        dest = cls.get_rect(handle)
+        dest.center = center
+        surface.blit(cls._atlas, dest, area)
+
     @classmethod
     def load(cls, name: str) -> pygame.Surface:
+        """画像をSurfaceとして返す (アトラスのサブサーフェスなので、書き換えずに使う)"""
         if name not in cls._cache:
-            path = os.path.join("images", f"{name}.png")
-            cls._cache[name] = pygame.image.load(path).convert_alpha()
-        return cls._cache[name]
\ No newline at end of file
+            handle = cls.get_handle(name)
+            cls._cache[name] = cls._atlas.subsurface(cls._rects[handle])
+        return cls._cache[name]
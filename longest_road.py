@@ -0,0 +1,112 @@
+Vertex = tuple[int,int]
+Edge = tuple[Vertex, Vertex]
+
+class LongestRoad:
+    """プレイヤーごとの道を隣接リストで持ち、変化のあった連結成分だけ最長経路を計算し直す"""
+
+    def __init__(self, player_num: int):
+        self.player_num = player_num
+        # 頂点 → (隣の頂点, 辺) のリスト
+        self.adjacency: list[dict[Vertex, list[tuple[Vertex, Edge]]]] = [{} for _ in range(player_num)]
+        # 辺 → 連結成分のID
+        self.component_by_edge: list[dict[Edge, int]] = [{} for _ in range(player_num)]
+        # 連結成分のID → その成分の最長経路
+        self.length_by_component: list[dict[int, int]] = [{} for _ in range(player_num)]
+        self.next_component_id = 0
+        # 開拓地・都市の持ち主 (他プレイヤーの道はこの頂点を通り抜けられない)
+        self.vertex_owner: dict[Vertex, int] = {}
+
+        self.lengths: list[int] = [0] * player_num
+
+    def add_road(self, edge: Edge, player_index: int):
+        adjacency = self.adjacency[player_index]
+        v1, v2 = edge
+        adjacency.setdefault(v1, []).append((v2, edge))
+        adjacency.setdefault(v2, []).append((v1, edge))
+        self.update_components(player_index, (edge,))
+
+    def add_settlement(self, vertex: Vertex, player_index: int):
+        self.vertex_owner[vertex] = player_index
+        # 他プレイヤーの道がこの頂点を通っていれば、その成分は分断される
+        for other_index in range(self.player_num):
+            if other_index != player_index and vertex in self.adjacency[other_index]:
+                self.update_components(other_index, tuple(edge for _, edge in self.adjacency[other_index][vertex]))
+
+    def remove_road(self, edge: Edge, player_index: int):
+        """add_roadを取り消す (残った道は分断されうるので、両端の成分を求め直す)"""
+        adjacency = self.adjacency[player_index]
+        v1, v2 = edge
+        for vertex, other_vertex in ((v1, v2), (v2, v1)):
+            adjacency[vertex].remove((other_vertex, edge))
+            if not adjacency[vertex]:
+                del adjacency[vertex]
+        self.length_by_component[player_index].pop(self.component_by_edge[player_index].pop(edge), None)
+        self.update_components(player_index, tuple(other_edge for vertex in edge if vertex in adjacency for _, other_edge in adjacency[vertex]))
+
+    def remove_settlement(self, vertex: Vertex):
+        """add_settlementを取り消す (分断されていた他プレイヤーの成分がつながり直す)"""
+        player_index = self.vertex_owner.pop(vertex)
+        for other_index in range(self.player_num):
+            if other_index != player_index and vertex in self.adjacency[other_index]:
+                self.update_components(other_index, tuple(edge for _, edge in self.adjacency[other_index][vertex]))
+
+    def is_blocked(self, vertex: Vertex, player_index: int):
+        return self.vertex_owner.get(vertex, player_index) != player_index
+
+    def update_components(self, player_index: int, seed_edges: tuple[Edge, ...]):
+        """seed_edgesを含む連結成分を求め直し、それぞれの最長経路を更新する"""
+        adjacency = self.adjacency[player_index]
+        component_by_edge = self.component_by_edge[player_index]
+        length_by_component = self.length_by_component[player_index]
+
+        assigned: set[Edge] = set()
+        for seed_edge in seed_edges:
+            if seed_edge in assigned:
+                continue
+            # 他プレイヤーの開拓地を通らずに辿れる辺を集める
+            component_edges: list[Edge] = [seed_edge]
+            assigned.add(seed_edge)
+            stack = [seed_edge]
+            while stack:
+                for vertex in stack.pop():
+                    if self.is_blocked(vertex, player_index):
+                        continue
+                    for _, edge in adjacency[vertex]:
+                        if edge not in assigned:
+                            assigned.add(edge)
+                            component_edges.append(edge)
+                            stack.append(edge)
+
+            for edge in component_edges:
+                if (old_id := component_by_edge.get(edge)) is not None:
+                    length_by_component.pop(old_id, None)
+
+            component_id = self.next_component_id
+            self.next_component_id += 1
+            for edge in component_edges:
+                component_by_edge[edge] = component_id
+            length_by_component[component_id] = self.get_component_length(player_index, component_edges)
+
+        self.lengths[player_index] = max(length_by_component.values(), default=0)
+
+    def get_component_length(self, player_index: int, component_edges: list[Edge]):
+        vertices = {vertex for edge in component_edges for vertex in edge}
+        visited_edges: set[Edge] = set()
+        return max(self.longest_path_from(vertex, visited_edges, player_index) for vertex in vertices)
+
+    def longest_path_from(self, vertex: Vertex, visited_edges: set[Edge], player_index: int):
+        max_length = 0
+
+        for next_vertex, edge in self.adjacency[player_index][vertex]:
+            if edge in visited_edges:
+                continue
+            # 他プレイヤーの開拓地で道は途切れる
+            if self.is_blocked(next_vertex, player_index):
+                length = 1
+            else:
+                visited_edges.add(edge)
+                length = 1 + self.longest_path_from(next_vertex, visited_edges, player_index)
+                visited_edges.discard(edge)
+            max_length = max(max_length, length)
+
+        return max_length
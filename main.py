@@ -1,37 +1,119 @@
+import time
+# 起動にかかった時間を測るため、他のモジュールを読み込む前の時刻を取っておく
+START_TIME = time.perf_counter()
+
 from board import Board, BoardState
+from game import Game
+from mcts import MCTSPlayer, create_player_rng
+from decision_service import DecisionService
+from replay import ReplayFile, parse_seed
+from profiler import FrameProfiler, StartupTimer
+import argparse
+import sys
 import pygame
 
+# 何も起きていない時に、イベントを待つ最大の時間 (ミリ秒)
+IDLE_WAIT_TIME = 1000
+
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--computers", type=int, nargs="*", default=[], help="コンピュータが担当する席 (1〜4)")
+    parser.add_argument("--playouts", type=int, default=1000, help="1手あたりのプレイアウト数")
+    parser.add_argument("--time-limit", type=float, default=None, help="1手あたりの探索時間 (秒)")
+    parser.add_argument("--workers", type=int, default=None, help="探索に使うプロセス数 (省略するとCPUの数)")
+    parser.add_argument("--seed", type=parse_seed, default=None, help="盤面の配置と乱数のシード")
+    parser.add_argument("--save-replay", default=None, help="終了時にリプレイを保存するファイル")
+    parser.add_argument("--no-profile", action="store_true", help="描画や入力の処理時間を計測しない")
+    parser.add_argument("--profile-output", default=None, help="終了時に処理時間の記録を書き出すファイル (.csvまたは.json)")
+    parser.add_argument("--startup-report", action="store_true", help="起動から最初のフレームまでの時間の内訳を表示する")
+    args = parser.parse_args()
+    startup_timer = StartupTimer(START_TIME)
+    startup_timer.mark("imports")
+
+    FrameProfiler.is_enabled = not args.no_profile
+    game = Game(args.seed)
+    if args.save_replay is not None:
+        game.start_recording_replay()
+    startup_timer.mark("game")
+
     clock = pygame.time.Clock()
-    board = Board()
+    # コンピュータがいる場合だけ、探索用のプロセスを用意する
+    decision_service = DecisionService(args.workers) if args.computers else None
+    board = Board(
+        game,
+        computer_players={seat - 1: MCTSPlayer(seat - 1, args.playouts, args.time_limit, rng=create_player_rng(game.seed, seat - 1)) for seat in args.computers},
+        decision_service=decision_service
+    )
+    startup_timer.mark("board")
+    is_first_frame_drawn = False
 
     while True:
-        clock.tick(60)
+        # アニメーション中だけ一定間隔で回し、それ以外は入力などのイベントが来るまで眠る
+        if board.is_animating():
+            elapsed_time = clock.tick(60)
+            events = pygame.event.get()
+        elif board.is_redraw_needed:
+            # 描き直しが必要な時 (最初のフレームなど) は待たずに描く
+            events = pygame.event.get()
+            clock.tick()
+            elapsed_time = 0
+        else:
+            events = [pygame.event.wait(IDLE_WAIT_TIME)] + pygame.event.get()
+            # 待っている間の時間をアニメーションの経過時間に含めないようにする
+            clock.tick()
+            elapsed_time = 0
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
+        for event in events:
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                if decision_service is not None:
+                    decision_service.shutdown()
+                if args.save_replay is not None:
+                    ReplayFile.save(args.save_replay, game)
+                if args.profile_output is not None:
+                    FrameProfiler.export(args.profile_output)
                 pygame.quit()
                 return
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    pygame.quit()
-                    return
+                # Fキーでサイコロの早送りを切り替える
+                if event.key == pygame.K_f:
+                    board.dices.is_fast_forward = not board.dices.is_fast_forward
+                # Pキーで処理時間の表示を切り替える
+                if event.key == pygame.K_p:
+                    FrameProfiler.toggle_overlay()
+                    board.is_redraw_needed = True
+            if event.type in (pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED, pygame.WINDOWSIZECHANGED):
+                board.is_redraw_needed = True
+            if event.type == pygame.MOUSEMOTION:
+                with FrameProfiler.section("input.hover"):
+                    if board.hover_from_mouse(event.pos):
+                        board.is_redraw_needed = True
             if event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button != 1:
-                    continue
-                if board.pick_town_pos_from_mouse(event.pos):
-                    continue
-                if board.pick_city_pos_from_mouse(event.pos):
+                # コンピュータの手番ではクリックを受け付けない
+                if event.button != 1 or board.is_computer_turn():
                     continue
-                if board.pick_way_pos_from_mouse(event.pos):
-                    continue
-                if board.pick_action_in_card_from_mouse(event.pos):
-                    continue
-                if board.pick_thief_pos_from_mouse(event.pos):
-                    continue
-                board.start_dice_rolling(event.pos)
+                board.is_redraw_needed = True
+                with FrameProfiler.section("input.click"):
+                    handle_click(board, event.pos)
 
-        board.draw()
+        with FrameProfiler.section("board.update"):
+            board.update(elapsed_time)
+        if board.is_redraw_needed or board.is_animating():
+            board.draw()
+            FrameProfiler.next_frame()
+            if not is_first_frame_drawn:
+                is_first_frame_drawn = True
+                startup_timer.mark("first frame")
+                if args.startup_report:
+                    print(startup_timer.format_report(), file=sys.stderr)
+
+def handle_click(board: Board, mouse_pos: tuple[int,int]):
+    """クリックを、受け付けた最初の操作に割り当てる (盤面への配置・手札の操作・盗賊の移動・サイコロ)"""
+    for pick_from_mouse in (board.pick_town_pos_from_mouse, board.pick_city_pos_from_mouse, board.pick_way_pos_from_mouse,
+                            board.pick_action_in_card_from_mouse, board.pick_thief_pos_from_mouse):
+        with FrameProfiler.section(f"input.{pick_from_mouse.__name__}"):
+            if pick_from_mouse(mouse_pos):
+                return
+    board.start_dice_rolling(mouse_pos)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,222 @@
+import math, random, time
+from game import Game, BoardState
+from hand import ActionType
+from moves import MoveType, MOVE_STRIDE, DICE_PROBABILITIES
+from state import GameState
+
+class MCTSNode:
+    """探索木の節 (状態は持たず、根からのアクションの並びで表す)"""
+    __slots__ = ("parent", "move", "player_index", "children", "visit_count", "total_reward")
+
+    def __init__(self, parent: "MCTSNode | None", move: int | None, player_index: int):
+        self.parent = parent
+        self.move = move
+        # この節に至るアクションを選んだプレイヤー (報酬はこのプレイヤーから見た値を足す)
+        self.player_index = player_index
+        self.children: dict[int, MCTSNode] = {}
+        self.visit_count = 0
+        self.total_reward = 0.0
+
+def create_player_rng(seed: int, player_index: int):
+    """対局のシードと席から、プレイヤーの選択に使う乱数を作る (Game.rngとは別の系列にする)"""
+    return random.Random(f"player:{seed}:{player_index}")
+
+def create_dices_rng(seed: int):
+    """対局のシードから、画面なしの対局でサイコロを振る乱数を作る (どのプレイヤーの乱数とも別の系列にする)"""
+    return random.Random(f"dices:{seed}")
+
+def roll_dices(rng: random.Random):
+    """2個のサイコロを振って、出目の合計のアクションを返す"""
+    return MoveType.ROLL * MOVE_STRIDE + rng.randint(1, 6) + rng.randint(1, 6)
+
+class RandomPlayer:
+    """建設を優先しながらランダムにアクションを選ぶプレイヤー (プレイアウトの方策にも使う)
+
+    再現したい場合は、create_player_rngなどでシードを固定したrandom.Randomを渡す
+    """
+    DICES_RESULTS = tuple(DICE_PROBABILITIES.keys())
+    DICES_WEIGHTS = tuple(DICE_PROBABILITIES.values())
+    # 優先する建設系のアクション
+    BUILD_ACTIONS = (ActionType.SETCITY, ActionType.SETTOWN, ActionType.DEVELOPMENT, ActionType.SETROAD)
+
+    def __init__(self, rng: random.Random | None = None):
+        self.rng = rng if rng is not None else random.Random()
+
+    def choose_move(self, game: Game):
+        if game.crnt_state == BoardState.ROLLDICE:
+            return MoveType.ROLL * MOVE_STRIDE + self.rng.choices(self.DICES_RESULTS, self.DICES_WEIGHTS)[0]
+        if game.crnt_state == BoardState.ACTION:
+            # 建設できるならターンを終えずに建設し、交渉はしない
+            possible_actions = game.hands[game.crnt_player_index].possible_actions
+            for action_type in self.BUILD_ACTIONS:
+                if action_type in possible_actions:
+                    return MoveType.SELECT_ACTION * MOVE_STRIDE + action_type
+            return MoveType.SELECT_ACTION * MOVE_STRIDE + ActionType.QUIT
+        return self.rng.choice(game.get_legal_moves())
+
+class MCTSPlayer:
+    """モンテカルロ木探索で次のアクションを選ぶコンピュータのプレイヤー
+
+    playout_numとtime_limitの両方を指定した場合は、先に達した方で探索を打ち切る
+    """
+    # 1回のプレイアウトで進めるアクションの上限 (ここで打ち切って得点で評価する)
+    ROLLOUT_DEPTH = 300
+
+    def __init__(self, player_index: int, playout_num: int | None = 1000, time_limit: float | None = None, exploration: float = 1.0, rng: random.Random | None = None):
+        self.player_index = player_index
+        self.playout_num = playout_num
+        self.time_limit = time_limit
+        self.exploration = exploration
+        # 展開する手の選択とプレイアウトで共有する乱数
+        self.rng = rng if rng is not None else random.Random()
+        self.rollout_player = RandomPlayer(self.rng)
+
+        # 前回の探索で選んだ手の先の部分木と、その根で想定している状態 (一致すれば次の探索で使い回す)
+        self.root: MCTSNode | None = None
+        self.root_state: GameState | None = None
+
+        # 直近の探索の統計
+        self.last_playout_num = 0
+        self.last_search_time = 0.0
+        self.last_reused_visit_count = 0
+
+    @property
+    def playouts_per_second(self):
+        return self.last_playout_num / self.last_search_time if self.last_search_time else 0.0
+
+    def choose_move(self, game: Game):
+        """gameの状態から最も多く訪れた手を返す (探索中はgameをその場で動かし、最後に元に戻す)
+
+        サイコロの出目は選べる手ではないので、探索せずに出目の確率に従って振る
+        """
+        if game.crnt_state == BoardState.ROLLDICE:
+            self.reset()
+            return self.rollout_player.choose_move(game)
+        moves = game.get_legal_moves()
+        if len(moves) == 1:
+            self.reset()
+            return moves[0]
+
+        root = self.get_root(game)
+        self.last_reused_visit_count = root.visit_count
+        is_recording = game.undo_log is not None
+        if not is_recording:
+            game.start_recording_undo()
+
+        start_time = time.perf_counter()
+        playout_num = 0
+        while True:
+            self.run_playout(game, root)
+            playout_num += 1
+            if self.playout_num is not None and playout_num >= self.playout_num:
+                break
+            if self.time_limit is not None and time.perf_counter() - start_time >= self.time_limit:
+                break
+            if self.playout_num is None and self.time_limit is None:
+                break
+        self.last_search_time = time.perf_counter() - start_time
+        self.last_playout_num = playout_num
+
+        best_move = max((move for move in moves if move in root.children), key=lambda move: root.children[move].visit_count)
+
+        # 選んだ手を進めた状態を覚えておく (サイコロや略奪のように結果が変わる場合は、次の探索で一致しなくなる)
+        mark = game.get_undo_mark()
+        game.apply_move(best_move)
+        self.root_state = GameState.from_game(game)
+        game.undo_to(mark)
+        self.root = root.children[best_move]
+        self.root.parent = None
+
+        if not is_recording:
+            game.stop_recording_undo()
+        return best_move
+
+    def get_root(self, game: Game):
+        if self.root is not None and self.root_state == GameState.from_game(game):
+            return self.root
+        return MCTSNode(None, None, self.player_index)
+
+    def reset(self):
+        self.root = None
+        self.root_state = None
+
+    def determinize(self, game: Game):
+        """このプレイヤーに見えない情報 (発展カードの山札の順番と、略奪・交渉相手を決める乱数) を、このプレイヤーの乱数で決め直す
+
+        探索で実際に引かれるカードや略奪の結果を覗かないようにする (undo_toで元の山札と乱数に戻る)
+        """
+        # 実際の順番が結果に影響しないように、並べ直してから混ぜる
+        developments = sorted(game.developments)
+        self.rng.shuffle(developments)
+        game.set_attr(game, "developments", developments)
+        game.set_attr(game, "rng", random.Random(self.rng.getrandbits(64)))
+
+    def run_playout(self, game: Game, root: MCTSNode):
+        mark = game.get_undo_mark()
+        self.determinize(game)
+        node = root
+        path = [root]
+
+        # 選択と展開
+        while game.get_winner() is None:
+            player_index = game.get_moving_player()
+            if game.crnt_state == BoardState.ROLLDICE:
+                # 偶然手番は出目の確率に従って選ぶ
+                move = self.rollout_player.choose_move(game)
+                game.apply_move(move)
+                if (child := node.children.get(move)) is None:
+                    child = node.children[move] = MCTSNode(node, move, player_index)
+                node = child
+                path.append(node)
+                continue
+
+            moves = game.get_legal_moves()
+            untried_moves = [move for move in moves if move not in node.children]
+            if untried_moves:
+                move = self.rng.choice(untried_moves)
+                game.apply_move(move)
+                child = node.children[move] = MCTSNode(node, move, player_index)
+                path.append(child)
+                break
+
+            node = self.select_child(node, moves)
+            game.apply_move(node.move)
+            path.append(node)
+
+        rewards = self.rollout(game)
+        for node in path:
+            node.visit_count += 1
+            node.total_reward += rewards[node.player_index]
+        game.undo_to(mark)
+
+    def select_child(self, node: MCTSNode, moves: list[int]):
+        """UCB1で子を選ぶ (状態によって選べる手が変わるので、今選べる手の子だけを比べる)"""
+        log_visit_count = math.log(node.visit_count + 1)
+        best_child = None
+        best_score = -math.inf
+        for move in moves:
+            child = node.children[move]
+            score = child.total_reward / child.visit_count + self.exploration * math.sqrt(log_visit_count / child.visit_count)
+            if score > best_score:
+                best_child = child
+                best_score = score
+        return best_child
+
+    def rollout(self, game: Game):
+        """簡単な方策で最後まで (または上限まで) 進め、各プレイヤーの報酬を返す"""
+        for _ in range(self.ROLLOUT_DEPTH):
+            if game.get_winner() is not None:
+                break
+            game.apply_move(self.rollout_player.choose_move(game))
+        return self.evaluate(game)
+
+    def evaluate(self, game: Game):
+        """勝者がいれば勝者に1、いなければ他のプレイヤーの平均との得点差を0〜1にしたもの"""
+        if (winner := game.get_winner()) is not None:
+            return [float(player_index == winner) for player_index in range(game.PLAYER_NUM)]
+        points = [hand.get_point() for hand in game.hands]
+        total_point = sum(points)
+        return [
+            min(1.0, max(0.0, 0.5 + (point - (total_point - point) / (game.PLAYER_NUM - 1)) / game.WINNING_POINT))
+            for point in points
+        ]
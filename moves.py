@@ -0,0 +1,75 @@
+from enum import IntEnum
+
+class MoveType(IntEnum):
+    """整数で表したアクションの種類 (アクションは 種類 * MOVE_STRIDE + 引数 で表す)"""
+    # 引数は頂点ID
+    PLACE_TOWN = 0
+    # 引数は辺ID
+    PLACE_ROAD = 1
+    # 引数は頂点ID
+    PLACE_CITY = 2
+    # 引数はマスのインデックス
+    MOVE_THIEF = 3
+    # 引数はプレイヤー
+    STEAL = 4
+    # 引数は資源のインデックス
+    PLENTY = 5
+    MONOPOLY = 6
+    # 引数は プレイヤー * 5 + 資源のインデックス (1枚ずつ捨てる)
+    DISCARD = 7
+    # 引数はActionType
+    SELECT_ACTION = 8
+    # 引数はDevelopmentCardType
+    USE_DEVELOPMENT = 9
+    # 引数は 渡す資源 * 5 + 受け取る資源 (1枚と1枚の交渉だけを表せる。2枚以上の交渉は画面からGame.tradeを呼ぶ場合だけ)
+    TRADE = 10
+    # 引数はサイコロの出目の合計 (偶然手番)
+    ROLL = 11
+
+# 頂点 (54) ・辺 (72) のどちらのIDも収まる幅
+MOVE_STRIDE = 128
+MOVE_NUM = len(MoveType) * MOVE_STRIDE
+
+# サイコロの出目の合計 → その確率
+DICE_PROBABILITIES = {dices_result: (6 - abs(dices_result - 7)) / 36 for dices_result in range(2, 13)}
+
+def encode_move(move_type: MoveType, arg: int):
+    return move_type * MOVE_STRIDE + arg
+
+def decode_move(move: int):
+    move_type, arg = divmod(move, MOVE_STRIDE)
+    return MoveType(move_type), arg
+
+class ReplayOp(IntEnum):
+    """リプレイのログに記録するGameのアクション (1バイトの種類の後に、1バイトずつの引数が続く)"""
+    # 頂点ID
+    PUT_TOWN = 0
+    PUT_CITY = 1
+    # 辺ID
+    PUT_ROAD = 2
+    # マスのインデックス
+    MOVE_THIEF = 3
+    # 出目の合計
+    RESOLVE_DICE = 4
+    # プレイヤー, 5種類の資源の枚数
+    DISCARD_RESOURCES = 5
+    # プレイヤー, 資源のインデックス
+    DISCARD_RESOURCE = 6
+    # プレイヤー
+    STEAL_RESOURCE = 7
+    # 資源のインデックス
+    PLENTY = 8
+    MONOPOLY = 9
+    # 渡す5種類の資源の枚数, 受け取る5種類の資源の枚数
+    TRADE = 10
+    # ActionType
+    SELECT_ACTION = 11
+    # DevelopmentCardType
+    USE_DEVELOPMENT = 12
+
+# ReplayOp → 引数のバイト数
+REPLAY_ARG_NUMS = {
+    ReplayOp.PUT_TOWN: 1, ReplayOp.PUT_CITY: 1, ReplayOp.PUT_ROAD: 1, ReplayOp.MOVE_THIEF: 1, ReplayOp.RESOLVE_DICE: 1,
+    ReplayOp.DISCARD_RESOURCES: 6, ReplayOp.DISCARD_RESOURCE: 2, ReplayOp.STEAL_RESOURCE: 1, ReplayOp.PLENTY: 1, ReplayOp.MONOPOLY: 1,
+    ReplayOp.TRADE: 10, ReplayOp.SELECT_ACTION: 1, ReplayOp.USE_DEVELOPMENT: 1,
+}
@@ -0,0 +1,41 @@
+from typing import Callable
+import numpy as np
+
+class ScreenPicker:
+    """画面上の頂点・辺・マスの当たり判定を、配列でまとめて計算する (盤面の配置ごとに一度だけ作る)"""
+
+    def __init__(self, vertex_points: list[tuple[float,float]], edge_points: list[tuple[tuple[float,float], tuple[float,float]]], hex_points: list[tuple[float,float]]):
+        self.vertex_points = np.array(vertex_points, dtype=np.float64)
+        self.hex_points = np.array(hex_points, dtype=np.float64)
+
+        edge_points = np.array(edge_points, dtype=np.float64)
+        self.edge_starts = edge_points[:, 0]
+        self.edge_directions = edge_points[:, 1] - edge_points[:, 0]
+        self.edge_squared_lengths = (self.edge_directions ** 2).sum(axis=1)
+        self.edge_lengths = np.sqrt(self.edge_squared_lengths)
+
+    def pick_vertex(self, mouse_pos: tuple[int,int], radius: float, is_candidate: Callable[[int], bool]):
+        return self.pick_nearest(np.hypot(self.vertex_points[:, 0] - mouse_pos[0], self.vertex_points[:, 1] - mouse_pos[1]), radius, is_candidate)
+
+    def pick_hex(self, mouse_pos: tuple[int,int], radius: float, is_candidate: Callable[[int], bool]):
+        return self.pick_nearest(np.hypot(self.hex_points[:, 0] - mouse_pos[0], self.hex_points[:, 1] - mouse_pos[1]), radius, is_candidate)
+
+    def pick_edge(self, mouse_pos: tuple[int,int], click_range: float, is_candidate: Callable[[int], bool]):
+        vx = mouse_pos[0] - self.edge_starts[:, 0]
+        vy = mouse_pos[1] - self.edge_starts[:, 1]
+        ux = self.edge_directions[:, 0]
+        uy = self.edge_directions[:, 1]
+        # 垂線の位置
+        t = (vx * ux + vy * uy) / self.edge_squared_lengths
+        # 距離（外積）
+        dists = np.abs(ux * vy - uy * vx) / self.edge_lengths
+        dists[(t < 0) | (t > 1)] = np.inf
+        return self.pick_nearest(dists, click_range, is_candidate)
+
+    def pick_nearest(self, dists: np.ndarray, radius: float, is_candidate: Callable[[int], bool]):
+        """範囲内で最も近い候補のIDを返す (範囲内の点は高々数個なので、候補かどうかはここで確かめる)"""
+        ids = np.flatnonzero(dists <= radius)
+        for i in ids[np.argsort(dists[ids])].tolist():
+            if is_candidate(i):
+                return i
+        return None
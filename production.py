@@ -0,0 +1,65 @@
+from hand import RESOURCE_NAMES
+from topology import BoardTopology
+
+class ProductionTable:
+    """サイコロの出目ごとに、資源を受け取る (プレイヤー, 資源のインデックス, 枚数) の一覧を保持する"""
+
+    def __init__(self, topology: BoardTopology, resource_by_space: list[str], number_by_space: list[int], thief_pos_index: int):
+        self.topology = topology
+        # 資源を生まないマス (砂漠・海・金脈) はNone
+        self.resource_index_by_space: list[int | None] = [RESOURCE_NAMES.index(resource) if resource in RESOURCE_NAMES else None for resource in resource_by_space]
+        self.number_by_space = number_by_space
+        self.thief_pos_index = thief_pos_index
+        # 頂点ID → (プレイヤー, 枚数)
+        self.building_by_vertex: dict[int, tuple[int, int]] = {}
+        # 出目 → {(マスID, 頂点ID): (プレイヤー, 資源のインデックス, 枚数)}
+        self.payouts_by_number: list[dict[tuple[int,int], tuple[int,int,int]]] = [{} for _ in range(13)]
+        # 同じ変更を反映する、BatchProductionとその行の番号 (batch_production.BatchProduction.from_gamesでつなぐ)
+        self.batch_row: tuple["BatchProduction", int] | None = None
+
+    def __getstate__(self):
+        # 複製したゲーム (探索用のプロセスに渡すものなど) は、元のBatchProductionとはつながない
+        state = self.__dict__.copy()
+        state["batch_row"] = None
+        return state
+
+    def set_building(self, vertex_id: int, player_index: int, multiplier: int):
+        """開拓地なら1枚、都市なら2枚として登録する (都市化は上書きになる)"""
+        self.building_by_vertex[vertex_id] = (player_index, multiplier)
+        for space_index in self.topology.vertex_hexes[vertex_id]:
+            self.add_payout(space_index, vertex_id)
+        if self.batch_row is not None:
+            self.batch_row[0].set_building(self.batch_row[1], vertex_id, player_index, multiplier)
+
+    def remove_building(self, vertex_id: int):
+        """建物を取り除く (Gameの取り消しで使う)"""
+        self.building_by_vertex.pop(vertex_id)
+        for space_index in self.topology.vertex_hexes[vertex_id]:
+            self.payouts_by_number[self.number_by_space[space_index]].pop((space_index, vertex_id), None)
+        if self.batch_row is not None:
+            self.batch_row[0].remove_building(self.batch_row[1], vertex_id)
+
+    def move_thief(self, thief_pos_index: int):
+        old_thief_pos_index = self.thief_pos_index
+        self.thief_pos_index = thief_pos_index
+        for vertex_id in self.topology.hex_vertices[old_thief_pos_index]:
+            if vertex_id in self.building_by_vertex:
+                self.add_payout(old_thief_pos_index, vertex_id)
+        payouts = self.payouts_by_number[self.number_by_space[thief_pos_index]]
+        for vertex_id in self.topology.hex_vertices[thief_pos_index]:
+            payouts.pop((thief_pos_index, vertex_id), None)
+        if self.batch_row is not None:
+            self.batch_row[0].move_thief(self.batch_row[1], thief_pos_index)
+
+    def add_payout(self, space_index: int, vertex_id: int):
+        if space_index == self.thief_pos_index or (resource_index := self.resource_index_by_space[space_index]) is None:
+            return
+        player_index, multiplier = self.building_by_vertex[vertex_id]
+        self.payouts_by_number[self.number_by_space[space_index]][(space_index, vertex_id)] = (player_index, resource_index, multiplier)
+
+    def get_resources_by_player(self, dices_result: int, player_num: int):
+        """出目に対して各プレイヤーが受け取る資源 (山札の枚数制限は考えない)"""
+        resources_by_player = [[0] * 5 for _ in range(player_num)]
+        for player_index, resource_index, multiplier in self.payouts_by_number[dices_result].values():
+            resources_by_player[player_index][resource_index] += multiplier
+        return resources_by_player
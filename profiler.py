@@ -0,0 +1,173 @@
+import csv
+import json
+import time
+from array import array
+import pygame
+from font_registry import FontRegistry
+
+class ProfileSection:
+    """1つの区間の処理時間を、最新のSAMPLE_NUM回分だけリングバッファに記録する (with文で囲んで使う)"""
+    __slots__ = ("name", "durations", "frame_indexes", "count", "start_time")
+
+    def __init__(self, name: str, sample_num: int):
+        self.name = name
+        # 処理時間 (ミリ秒) と、計測したフレームの番号
+        self.durations = array("d", [0.0]) * sample_num
+        self.frame_indexes = array("q", [0]) * sample_num
+        self.count = 0
+        self.start_time = 0
+
+    def __enter__(self):
+        self.start_time = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *_):
+        i = self.count % len(self.durations)
+        self.durations[i] = (time.perf_counter_ns() - self.start_time) / 1e6
+        self.frame_indexes[i] = FrameProfiler.frame_index
+        self.count += 1
+
+    def get_samples(self):
+        """記録が残っている (フレームの番号, 処理時間) を古い順に返す"""
+        sample_num = len(self.durations)
+        if self.count <= sample_num:
+            indexes = range(self.count)
+        else:
+            start = self.count % sample_num
+            indexes = [*range(start, sample_num), *range(start)]
+        return [(self.frame_indexes[i], self.durations[i]) for i in indexes]
+
+    def get_percentiles(self, percents: tuple[int, ...] = (50, 95, 99)):
+        """最近の記録の分位点 (ミリ秒) を最近傍順位で求める"""
+        durations = sorted(self.durations[:min(self.count, len(self.durations))])
+        if not durations:
+            return [0.0] * len(percents)
+        return [durations[min(len(durations) - 1, max(0, -(-percent * len(durations) // 100) - 1))] for percent in percents]
+
+class NullSection:
+    """計測を止めている間に返す、何もしない区間"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+class FrameProfiler:
+    """区間の名前ごとの処理時間を集め、分位点の表示と書き出しを行う (常に有効にしておいても軽いようにしている)"""
+    SAMPLE_NUM = 600
+    PERCENTS = (50, 95, 99)
+    # オーバーレイの数値を作り直す間隔 (ミリ秒)
+    OVERLAY_UPDATE_TIME = 500
+    OVERLAY_FONT_SIZE = 14
+    OVERLAY_BG_COLOR = (0,0,0,180)
+    OVERLAY_FONT_COLOR = (255,255,255)
+
+    is_enabled: bool = True
+    is_overlay_visible: bool = False
+    frame_index: int = 0
+    _sections: dict[str, ProfileSection] = {}
+    _null_section = NullSection()
+    _overlay_surface: pygame.Surface | None = None
+    _overlay_updated_time: int = -OVERLAY_UPDATE_TIME
+
+    @classmethod
+    def section(cls, name: str) -> ProfileSection | NullSection:
+        """with FrameProfiler.section("board.draw"): のように、計測したい処理を囲む"""
+        if not cls.is_enabled:
+            return cls._null_section
+        if (section := cls._sections.get(name)) is None:
+            section = cls._sections[name] = ProfileSection(name, cls.SAMPLE_NUM)
+        return section
+
+    @classmethod
+    def next_frame(cls):
+        cls.frame_index += 1
+
+    @classmethod
+    def toggle_overlay(cls):
+        cls.is_overlay_visible = not cls.is_overlay_visible
+        cls._overlay_surface = None
+
+    @classmethod
+    def reset(cls):
+        cls._sections.clear()
+        cls.frame_index = 0
+        cls._overlay_surface = None
+
+    @classmethod
+    def get_summary(cls):
+        """区間の名前 → 回数と分位点 (ミリ秒)"""
+        summary = {}
+        for name, section in cls._sections.items():
+            percentiles = section.get_percentiles(cls.PERCENTS)
+            summary[name] = {"count": section.count, **{f"p{percent}_ms": value for percent, value in zip(cls.PERCENTS, percentiles)}}
+        return summary
+
+    @classmethod
+    def draw_overlay(cls, screen: pygame.Surface, pos: tuple[int,int]):
+        """区間ごとの分位点の表を描く (数値はOVERLAY_UPDATE_TIMEごとにだけ描き直す)"""
+        if not cls.is_overlay_visible:
+            return
+        ticks = pygame.time.get_ticks()
+        if cls._overlay_surface is None or ticks - cls._overlay_updated_time >= cls.OVERLAY_UPDATE_TIME:
+            cls._overlay_surface = cls.render_overlay()
+            cls._overlay_updated_time = ticks
+        screen.blit(cls._overlay_surface, pos)
+
+    @classmethod
+    def render_overlay(cls):
+        font = FontRegistry.get("Arial", cls.OVERLAY_FONT_SIZE)
+        # 値が毎回変わるので、TextCacheを通さずに描く
+        lines = ["section".ljust(28) + "".join(f"p{percent}".rjust(9) for percent in cls.PERCENTS)]
+        for name, values in sorted(cls.get_summary().items()):
+            lines.append(name.ljust(28) + "".join(f"{values[f'p{percent}_ms']:9.2f}" for percent in cls.PERCENTS))
+        line_surfs = [font.render(line, True, cls.OVERLAY_FONT_COLOR) for line in lines]
+        line_height = font.get_linesize()
+        surface = pygame.Surface((max(surf.get_width() for surf in line_surfs) + 10, line_height * len(line_surfs) + 10), pygame.SRCALPHA)
+        surface.fill(cls.OVERLAY_BG_COLOR)
+        for i, surf in enumerate(line_surfs):
+            surface.blit(surf, (5, 5 + line_height * i))
+        return surface
+
+    @classmethod
+    def export(cls, path: str):
+        """記録を書き出す (拡張子が.csvなら1回の計測を1行に、それ以外は分位点と記録をJSONにする)"""
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(("section", "frame", "duration_ms"))
+                for name, section in cls._sections.items():
+                    for frame_index, duration in section.get_samples():
+                        writer.writerow((name, frame_index, f"{duration:.4f}"))
+            return
+
+        summary = cls.get_summary()
+        with open(path, "w") as f:
+            json.dump({
+                "frame_num": cls.frame_index,
+                "sections": {
+                    name: {**summary[name], "samples": [[frame_index, round(duration, 4)] for frame_index, duration in section.get_samples()]}
+                    for name, section in cls._sections.items()
+                },
+            }, f)
+
+class StartupTimer:
+    """起動から最初のフレームを描くまでの、段階ごとの時間を記録する"""
+
+    def __init__(self, start_time: float):
+        self.start_time = start_time
+        self.marks: list[tuple[str, float]] = []
+
+    def mark(self, name: str):
+        """直前の段階がここで終わったことを記録する"""
+        self.marks.append((name, time.perf_counter()))
+
+    def format_report(self):
+        lines = []
+        prev_time = self.start_time
+        for name, mark_time in self.marks:
+            lines.append(f"{name:16s} {(mark_time - prev_time) * 1000:8.1f} ms (total {(mark_time - self.start_time) * 1000:8.1f} ms)")
+            prev_time = mark_time
+        return "\n".join(lines)
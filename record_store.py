@@ -0,0 +1,223 @@
+import argparse
+import os
+import numpy as np
+from game import Game
+from hand import RESOURCE_NAMES
+from moves import ReplayOp, REPLAY_ARG_NUMS
+
+# 港の種類 (資源のインデックスの後に3:1の港)
+PORT_TYPES = RESOURCE_NAMES + ("general",)
+SPACE_NUM = 19
+PORT_NUM = 9
+VERTEX_NUM = 54
+PLAYER_NUM = Game.PLAYER_NUM
+# 最初の開拓地を置く順番 (1周目は0→3、2周目は3→0)
+OPENING_ORDER = tuple(range(PLAYER_NUM)) + tuple(reversed(range(PLAYER_NUM)))
+
+# 列の名前 → (型, 1行あたりの形)
+GAME_COLUMNS: dict[str, tuple[type, tuple[int, ...]]] = {
+    "seed": (np.uint64, ()),
+    "winner": (np.int8, ()),
+    "turn_num": (np.int32, ()),
+    "resource_by_space": (np.int8, (SPACE_NUM,)),
+    "number_by_space": (np.int8, (SPACE_NUM,)),
+    "port_types": (np.int8, (PORT_NUM,)),
+    "points": (np.int8, (PLAYER_NUM,)),
+    # 各プレイヤーの1つ目と2つ目の開拓地の頂点ID
+    "opening_vertices": (np.int16, (PLAYER_NUM, 2)),
+    # この対局のターンとアクションが、それぞれの表のどこから始まるか
+    "turn_offset": (np.int64, ()),
+    "action_offset": (np.int64, ()),
+    "action_length": (np.int32, ()),
+}
+TURN_COLUMNS: dict[str, tuple[type, tuple[int, ...]]] = {
+    "game_index": (np.int32, ()),
+    "player_index": (np.int8, ()),
+    "resources": (np.int8, (PLAYER_NUM, len(RESOURCE_NAMES))),
+    "points": (np.int8, (PLAYER_NUM,)),
+}
+ACTION_FILE_NAME = "actions.bin"
+
+def get_column_path(path: str, table: str, name: str):
+    return os.path.join(path, f"{table}_{name}.bin")
+
+def get_row_size(dtype: type, shape: tuple[int, ...]):
+    return np.dtype(dtype).itemsize * int(np.prod(shape, dtype=np.int64))
+
+def get_row_num(path: str, table: str, columns: dict[str, tuple[type, tuple[int, ...]]]):
+    """全ての列に揃って書かれている行数 (書き込みの途中で止まった行は数えない)"""
+    row_nums = []
+    for name, (dtype, shape) in columns.items():
+        column_path = get_column_path(path, table, name)
+        row_nums.append(os.path.getsize(column_path) // get_row_size(dtype, shape) if os.path.exists(column_path) else 0)
+    return min(row_nums)
+
+class GameRecord:
+    """1局分の記録 (ターンの始めごとにrecord_turnを呼び、終わったらfinishで結果を書き込む)
+
+    アクションの列はGame.replay_logをそのまま使うので、対局の最初からリプレイを記録しておく必要がある
+    """
+
+    def __init__(self, game: Game):
+        self.seed = game.seed
+        self.resource_by_space = [RESOURCE_NAMES.index(resource) if resource in RESOURCE_NAMES else -1 for resource in game.resource_by_space]
+        self.number_by_space = list(game.number_by_space)
+        self.port_types = [PORT_TYPES.index(resource) for resource, _ in game.ports.values()]
+
+        self.turn_player_indexes: list[int] = []
+        self.turn_resources: list[list[list[int]]] = []
+        self.turn_points: list[list[int]] = []
+
+        self.winner = -1
+        self.points = [0] * PLAYER_NUM
+        self.opening_vertices = [[-1, -1] for _ in range(PLAYER_NUM)]
+        self.actions = b""
+
+    def record_turn(self, game: Game):
+        self.turn_player_indexes.append(game.crnt_player_index)
+        self.turn_resources.append([hand.resources for hand in game.hands])
+        self.turn_points.append([hand.get_point() for hand in game.hands])
+
+    def finish(self, game: Game):
+        winner = game.get_winner()
+        self.winner = winner if winner is not None else -1
+        self.points = [hand.get_point() for hand in game.hands]
+        self.actions = bytes(game.replay_log)
+
+        # 最初の8回の開拓地の配置から、各プレイヤーの初期配置を取り出す
+        town_num = 0
+        position = 0
+        while position < len(self.actions) and town_num < len(OPENING_ORDER):
+            replay_op = self.actions[position]
+            if replay_op == ReplayOp.PUT_TOWN:
+                self.opening_vertices[OPENING_ORDER[town_num]][town_num // PLAYER_NUM] = self.actions[position + 1]
+                town_num += 1
+            position += 1 + REPLAY_ARG_NUMS[replay_op]
+
+class GameRecordWriter:
+    """対局の記録を、列ごとのファイルの末尾に追記する"""
+
+    def __init__(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        # 途中で止まった書き込みがあれば、揃っている行数に切り詰めてから追記する
+        self.game_num = self.truncate_table("game", GAME_COLUMNS)
+        self.turn_num = self.truncate_table("turn", TURN_COLUMNS)
+        self.game_files = {name: open(get_column_path(path, "game", name), "ab") for name in GAME_COLUMNS}
+        self.turn_files = {name: open(get_column_path(path, "turn", name), "ab") for name in TURN_COLUMNS}
+        self.action_file = open(os.path.join(path, ACTION_FILE_NAME), "ab")
+        self.action_num = self.action_file.tell()
+
+    def truncate_table(self, table: str, columns: dict[str, tuple[type, tuple[int, ...]]]):
+        row_num = get_row_num(self.path, table, columns)
+        for name, (dtype, shape) in columns.items():
+            with open(get_column_path(self.path, table, name), "ab") as f:
+                f.truncate(row_num * get_row_size(dtype, shape))
+        return row_num
+
+    def append(self, record: GameRecord):
+        turn_num = len(record.turn_player_indexes)
+        turn_values = {
+            "game_index": [self.game_num] * turn_num,
+            "player_index": record.turn_player_indexes,
+            "resources": record.turn_resources,
+            "points": record.turn_points,
+        }
+        for name, (dtype, shape) in TURN_COLUMNS.items():
+            self.turn_files[name].write(np.asarray(turn_values[name], dtype=dtype).reshape((turn_num, *shape)).tobytes())
+
+        self.action_file.write(record.actions)
+
+        game_values = {
+            "seed": record.seed,
+            "winner": record.winner,
+            "turn_num": turn_num,
+            "resource_by_space": record.resource_by_space,
+            "number_by_space": record.number_by_space,
+            "port_types": record.port_types,
+            "points": record.points,
+            "opening_vertices": record.opening_vertices,
+            "turn_offset": self.turn_num,
+            "action_offset": self.action_num,
+            "action_length": len(record.actions),
+        }
+        for name, (dtype, shape) in GAME_COLUMNS.items():
+            self.game_files[name].write(np.asarray(game_values[name], dtype=dtype).reshape(shape).tobytes())
+
+        self.game_num += 1
+        self.turn_num += turn_num
+        self.action_num += len(record.actions)
+
+    def flush(self):
+        for f in (*self.game_files.values(), *self.turn_files.values(), self.action_file):
+            f.flush()
+
+    def close(self):
+        for f in (*self.game_files.values(), *self.turn_files.values(), self.action_file):
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+class GameRecordReader:
+    """列ごとのファイルをメモリマップで開き、コピーせずに配列として読む"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.game_num = get_row_num(path, "game", GAME_COLUMNS)
+        self.turn_num = get_row_num(path, "turn", TURN_COLUMNS)
+        self.games = {name: self.open_column(get_column_path(path, "game", name), dtype, (self.game_num, *shape)) for name, (dtype, shape) in GAME_COLUMNS.items()}
+        self.turns = {name: self.open_column(get_column_path(path, "turn", name), dtype, (self.turn_num, *shape)) for name, (dtype, shape) in TURN_COLUMNS.items()}
+        action_path = os.path.join(path, ACTION_FILE_NAME)
+        self.actions = self.open_column(action_path, np.uint8, (os.path.getsize(action_path) if os.path.exists(action_path) else 0,))
+
+    @staticmethod
+    def open_column(column_path: str, dtype: type, shape: tuple[int, ...]):
+        # 空のファイルはメモリマップできないので、空の配列で代わりにする
+        if shape[0] == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(column_path, dtype=dtype, mode="r", shape=shape)
+
+    def get_turns(self, game_index: int):
+        """この対局のターンの行の範囲 (slice) を返す"""
+        start = int(self.games["turn_offset"][game_index])
+        return slice(start, start + int(self.games["turn_num"][game_index]))
+
+    def get_actions(self, game_index: int):
+        """この対局のアクションの列 (Game.replay_logと同じ形式)"""
+        start = int(self.games["action_offset"][game_index])
+        return self.actions[start:start + int(self.games["action_length"][game_index])]
+
+    def get_win_rate_by_opening_vertex(self, chunk_size: int = 1 << 20):
+        """頂点IDごとに、そこに初期配置の開拓地を置いた回数と、そのプレイヤーが勝った割合を返す (chunk_size局ずつ読む)"""
+        opening_counts = np.zeros(VERTEX_NUM, dtype=np.int64)
+        win_counts = np.zeros(VERTEX_NUM, dtype=np.int64)
+        players = np.arange(PLAYER_NUM)
+        for start in range(0, self.game_num, chunk_size):
+            opening_vertices = np.asarray(self.games["opening_vertices"][start:start + chunk_size], dtype=np.int64)
+            winners = np.asarray(self.games["winner"][start:start + chunk_size])
+            is_winner = np.repeat((winners[:, None] == players), 2, axis=1).reshape(opening_vertices.shape)
+            is_valid = opening_vertices >= 0
+            opening_counts += np.bincount(opening_vertices[is_valid], minlength=VERTEX_NUM)
+            win_counts += np.bincount(opening_vertices[is_valid & is_winner], minlength=VERTEX_NUM)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            win_rates = np.where(opening_counts > 0, win_counts / opening_counts, np.nan)
+        return opening_counts, win_rates
+
+def main():
+    parser = argparse.ArgumentParser(description="対局の記録から、初期配置の頂点ごとの勝率を表示する")
+    parser.add_argument("path", help="記録のディレクトリ")
+    parser.add_argument("--top", type=int, default=10, help="表示する頂点の数")
+    args = parser.parse_args()
+
+    reader = GameRecordReader(args.path)
+    opening_counts, win_rates = reader.get_win_rate_by_opening_vertex()
+    print(f"{reader.game_num} games, {reader.turn_num} turns, {len(reader.actions)} action bytes")
+    for vertex_id in np.argsort(np.nan_to_num(win_rates, nan=-1.0))[::-1][:args.top]:
+        print(f"vertex {vertex_id}: {win_rates[vertex_id]:.3f} ({opening_counts[vertex_id]} openings)")
+
+if __name__ == "__main__":
+    main()
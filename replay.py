@@ -0,0 +1,109 @@
+import argparse
+import struct
+import sys
+import time
+from game import Game, BoardState
+from hand import ActionType, DevelopmentCardType
+from moves import ReplayOp, REPLAY_ARG_NUMS
+from state import GameState
+
+def parse_seed(value: str):
+    """コマンドライン引数のシード (ReplayFileのヘッダとGameRecordに符号なし64ビットで保存するので、その範囲に限る)"""
+    seed = int(value)
+    if not 0 <= seed < 2**64:
+        raise argparse.ArgumentTypeError(f"seed must be between 0 and 2**64-1: {value}")
+    return seed
+
+class ReplayFile:
+    """対局のシードとアクションのログを保存する形式
+
+    ヘッダ (マジック, 版, シード, 最後の状態のCRC32, ログのバイト数) の後に、Game.replay_logのバイト列がそのまま続く
+    """
+    MAGIC = b"CTNR"
+    # 2: 最後の状態のCRC32に、最長経路の長さ (建物と道から求め直せる値) を含めなくなった
+    VERSION = 2
+    HEADER = struct.Struct("<4sBQII")
+
+    @classmethod
+    def save(cls, path: str, game: Game):
+        replay_log = game.replay_log if game.replay_log is not None else bytearray()
+        with open(path, "wb") as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, game.seed, GameState.from_game(game).get_digest(), len(replay_log)))
+            f.write(replay_log)
+
+    @classmethod
+    def load(cls, path: str):
+        """(シード, 最後の状態のCRC32, ログ) を返す"""
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, seed, digest, log_length = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError(f"{path} is not a replay file")
+        replay_log = data[cls.HEADER.size:cls.HEADER.size + log_length]
+        if len(replay_log) != log_length:
+            raise ValueError(f"{path} is truncated")
+        return seed, digest, replay_log
+
+def replay(seed: int, replay_log: bytes):
+    """画面なしでログのアクションを最初から実行し直し、最後の状態のGameと実行したアクション数を返す"""
+    game = Game(seed)
+    vertices = game.topology.vertices
+    edges = game.topology.edges
+    position = 0
+    action_num = 0
+    while position < len(replay_log):
+        replay_op = ReplayOp(replay_log[position])
+        args = replay_log[position + 1:position + 1 + REPLAY_ARG_NUMS[replay_op]]
+        if replay_op == ReplayOp.PUT_TOWN:
+            is_done = game.put_town(vertices[args[0]])
+        elif replay_op == ReplayOp.PUT_CITY:
+            is_done = game.put_city(vertices[args[0]])
+        elif replay_op == ReplayOp.PUT_ROAD:
+            is_done = game.put_road(edges[args[0]])
+        elif replay_op == ReplayOp.MOVE_THIEF:
+            is_done = game.move_thief(args[0])
+        elif replay_op == ReplayOp.RESOLVE_DICE:
+            is_done = game.resolve_dice(args[0])
+        elif replay_op == ReplayOp.DISCARD_RESOURCES:
+            is_done = game.discard_resources(args[0], list(args[1:]))
+        elif replay_op == ReplayOp.DISCARD_RESOURCE:
+            is_done = game.discard_resource(args[0], args[1])
+        elif replay_op == ReplayOp.STEAL_RESOURCE:
+            is_done = game.steal_resource(args[0]) is not None
+        elif replay_op == ReplayOp.PLENTY:
+            is_done = game.get_resource_by_plenty(args[0])
+        elif replay_op == ReplayOp.MONOPOLY:
+            is_done = game.get_resource_by_monopoly(args[0])
+        elif replay_op == ReplayOp.TRADE:
+            # 交渉は相手がいなくても終わるので、成立したかどうかは問わない (交渉の状態でなければ再生できない)
+            is_done = game.crnt_state == BoardState.TRADE
+            if is_done:
+                game.trade(list(args[:5]), list(args[5:]))
+        elif replay_op == ReplayOp.SELECT_ACTION:
+            is_done = game.select_action(ActionType(args[0]))
+        else:
+            is_done = game.use_development(DevelopmentCardType(args[0]))
+        if not is_done:
+            raise ValueError(f"action {action_num} ({replay_op.name} {list(args)}) could not be replayed")
+        position += 1 + len(args)
+        action_num += 1
+    return game, action_num
+
+def main():
+    parser = argparse.ArgumentParser(description="保存したリプレイを画面なしで最後まで実行し、最後の状態が一致するかを確かめる")
+    parser.add_argument("paths", nargs="+", help="リプレイのファイル")
+    args = parser.parse_args()
+
+    is_all_matched = True
+    for path in args.paths:
+        seed, digest, replay_log = ReplayFile.load(path)
+        start_time = time.perf_counter()
+        game, action_num = replay(seed, replay_log)
+        elapsed_time = time.perf_counter() - start_time
+        is_matched = GameState.from_game(game).get_digest() == digest
+        is_all_matched &= is_matched
+        print(f"{path}: seed {seed}, {action_num} actions in {elapsed_time*1000:.1f}ms ({action_num / elapsed_time if elapsed_time else 0:.0f} actions/s), final state {'matched' if is_matched else 'MISMATCHED'}, points {[hand.get_point() for hand in game.hands]}")
+    sys.exit(0 if is_all_matched else 1)
+
+if __name__ == "__main__":
+    main()
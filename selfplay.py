@@ -0,0 +1,122 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from game import Game, BoardState
+from hand import DevelopmentCardType
+from mcts import MCTSPlayer, RandomPlayer, create_player_rng, create_dices_rng, roll_dices
+from record_store import GameRecord, GameRecordWriter
+from replay import ReplayFile, parse_seed
+
+# 勝者が出ないまま進み続ける対局を打ち切るアクション数
+MAX_STEPS = 20000
+
+def create_players(seed: int, player_kinds: list[str], playout_num: int | None, time_limit: float | None):
+    """各席のプレイヤーに、対局のシードと席から作った乱数を渡す"""
+    return [
+        MCTSPlayer(i, playout_num, time_limit, rng=create_player_rng(seed, i)) if kind == "mcts" else RandomPlayer(create_player_rng(seed, i))
+        for i, kind in enumerate(player_kinds)
+    ]
+
+def play_game(seed: int, player_kinds: list[str], playout_num: int | None, time_limit: float | None, max_steps: int = MAX_STEPS, replay_dir: str | None = None, is_recording: bool = False):
+    """画面なしで1局を最後まで進め、結果をdictで返す
+
+    replay_dirを指定するとリプレイも保存し、is_recordingがTrueなら"record"にGameRecordを入れて返す
+    """
+    start_time = time.perf_counter()
+    # 盤面の配置・サイコロの出目・プレイヤーの選択は、この対局のシードだけで決まる
+    game = Game(seed)
+    if replay_dir is not None or is_recording:
+        game.start_recording_replay()
+    record = GameRecord(game) if is_recording else None
+    players = create_players(seed, player_kinds, playout_num, time_limit)
+    # サイコロはプレイヤーに選ばせず、対局のシードから作った乱数で振る
+    dices_rng = create_dices_rng(seed)
+
+    step_num = 0
+    turn_num = 0
+    while game.get_winner() is None and step_num < max_steps:
+        if game.crnt_state == BoardState.ROLLDICE:
+            turn_num += 1
+            if record is not None:
+                record.record_turn(game)
+            game.apply_move(roll_dices(dices_rng))
+        else:
+            game.apply_move(players[game.get_moving_player()].choose_move(game))
+        step_num += 1
+    if replay_dir is not None:
+        ReplayFile.save(os.path.join(replay_dir, f"{seed}.catr"), game)
+    if record is not None:
+        record.finish(game)
+
+    result = {
+        "seed": seed,
+        "winner": game.get_winner(),
+        "turns": turn_num,
+        "steps": step_num,
+        "points": [hand.get_point() for hand in game.hands],
+        # 勝利点の内訳
+        "point_details": [
+            {
+                "towns": hand.town_count,
+                "cities": hand.city_count * 2,
+                "point_cards": hand.developments[DevelopmentCardType.POINT],
+                "max_knight_power": hand.is_max_knight_power * 2,
+                "max_length": hand.is_max_length * 2,
+            }
+            for hand in game.hands
+        ],
+        "max_length_player": game.max_length_player,
+        "max_knight_power_player": game.max_knight_power_player[0] if game.max_knight_power_player is not None else None,
+        "time": time.perf_counter() - start_time,
+    }
+    if record is not None:
+        result["record"] = record
+    return result
+
+def play_game_from_args(args: tuple):
+    return play_game(*args)
+
+def main():
+    parser = argparse.ArgumentParser(description="画面なしで複数の対局を並列に行い、結果を1行ずつJSONで書き出す")
+    parser.add_argument("--games", type=int, default=100, help="対局数")
+    parser.add_argument("--seed", type=parse_seed, default=0, help="最初の対局のシード (対局ごとに1ずつ増やす)")
+    parser.add_argument("--workers", type=int, default=None, help="プロセス数 (省略するとCPUの数)")
+    parser.add_argument("--players", nargs=Game.PLAYER_NUM, choices=("mcts", "random"), default=["random"] * Game.PLAYER_NUM, help="各席のプレイヤー")
+    parser.add_argument("--playouts", type=int, default=200, help="MCTSの1手あたりのプレイアウト数")
+    parser.add_argument("--time-limit", type=float, default=None, help="MCTSの1手あたりの探索時間 (秒)")
+    parser.add_argument("--max-steps", type=int, default=MAX_STEPS, help="1局あたりのアクション数の上限")
+    parser.add_argument("--output", default="selfplay_results.jsonl", help="結果を書き出すファイル")
+    parser.add_argument("--replay-dir", default=None, help="各対局のリプレイを保存するディレクトリ")
+    parser.add_argument("--record-dir", default=None, help="全ての対局の記録を列ごとに追記するディレクトリ (record_store.pyで集計できる)")
+    args = parser.parse_args()
+
+    if args.replay_dir is not None:
+        os.makedirs(args.replay_dir, exist_ok=True)
+    tasks = [(args.seed + i, args.players, args.playouts, args.time_limit, args.max_steps, args.replay_dir, args.record_dir is not None) for i in range(args.games)]
+    win_counts = [0] * Game.PLAYER_NUM
+    start_time = time.perf_counter()
+    writer = GameRecordWriter(args.record_dir) if args.record_dir is not None else None
+    with multiprocessing.Pool(args.workers) as pool, open(args.output, "w") as f:
+        # 終わった対局から順に書き出す
+        for game_num, result in enumerate(pool.imap_unordered(play_game_from_args, tasks), 1):
+            if writer is not None:
+                writer.append(result.pop("record"))
+            f.write(json.dumps(result) + "\n")
+            f.flush()
+            if result["winner"] is not None:
+                win_counts[result["winner"]] += 1
+            elapsed_time = time.perf_counter() - start_time
+            print(f"\r{game_num}/{args.games} games, {game_num / elapsed_time:.2f} games/s", end="", file=sys.stderr)
+
+    if writer is not None:
+        writer.close()
+
+    elapsed_time = time.perf_counter() - start_time
+    print(file=sys.stderr)
+    print(f"{args.games} games in {elapsed_time:.2f}s ({args.games / elapsed_time:.2f} games/s), wins by seat: {win_counts}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import zlib
+from array import array
+from collections import defaultdict
+from game import Game, BoardState
+from hand import DevelopmentCardType, ActionType
+from longest_road import LongestRoad
+from connectivity import NetworkConnectivity
+from production import ProductionTable
+from topology import iter_bits
+
+# 持ち主がいないことを表す値
+NO_PLAYER = -1
+
+class GameState:
+    """Gameの変化する状態だけを、頂点ID・辺IDで引ける小さな整数の配列にまとめたもの (探索で複製するために使う)
+
+    盤面の配置 (マスの資源・番号、港、隣接関係) は複製せず、元のGameと共有する前提で持たない
+    最長経路の長さのように建物と道から求め直せる値と、Game.rng (略奪・交渉相手を決める乱数) の状態も持たない
+    (比較とget_digestは乱数の状態によらず、apply_toもgame.rngをそのままにする。リプレイは同じシードから実行し直すので乱数も一致する)
+    """
+    __slots__ = (
+        "player_num", "vertex_num", "edge_num",
+        "vertex_owners", "vertex_levels", "edge_owners",
+        "possible_towns", "possible_roads", "possible_ships",
+        "resources", "resources_already_get", "resources_to_get_by_plenty",
+        "developments", "developments_got_now", "developments_used", "development_deck",
+        "piece_counts", "resource_nums_to_be_discarded", "possible_actions",
+        "crnt_state", "crnt_player_index", "thief_pos_index",
+        "is_trade_not_done", "is_development_used",
+        "max_knight_power_player", "max_knight_power", "max_length_player",
+        "players_to_be_stolen",
+    )
+    RESOURCE_NUM = 5
+    # piece_countsの並び (道・船・開拓地・都市)
+    PIECE_NUM = 4
+
+    @classmethod
+    def from_game(cls, game: Game):
+        topology = game.topology
+        player_num, vertex_num, edge_num = game.PLAYER_NUM, len(topology.vertices), len(topology.edges)
+        state = cls.__new__(cls)
+        state.player_num = player_num
+        state.vertex_num = vertex_num
+        state.edge_num = edge_num
+
+        # 頂点ごとの建物の持ち主と種類 (0: なし、1: 開拓地、2: 都市)、辺ごとの道の持ち主
+        state.vertex_owners = array("b", [NO_PLAYER]) * vertex_num
+        state.vertex_levels = bytearray(vertex_num)
+        for level, buildings in ((1, game.towns_already_set), (2, game.cities_already_set)):
+            for vertex, player_index in buildings.items():
+                vertex_id = topology.vertex_ids[vertex]
+                state.vertex_owners[vertex_id] = player_index
+                state.vertex_levels[vertex_id] = level
+        state.edge_owners = array("b", [NO_PLAYER]) * edge_num
+        for edge, player_index in game.ways_already_set.items():
+            state.edge_owners[topology.edge_ids[edge]] = player_index
+
+        # 配置できる場所の候補 ([プレイヤー * 頂点数 + 頂点ID] が1なら候補)
+        state.possible_towns = bytearray(player_num * vertex_num)
+        state.possible_roads = bytearray(player_num * edge_num)
+        state.possible_ships = bytearray(player_num * edge_num)
+        for player in game.player_list:
+            for vertex_id in iter_bits(player.possible_town_mask):
+                state.possible_towns[player.player_index * vertex_num + vertex_id] = 1
+            for edge_id in iter_bits(player.possible_road_mask):
+                state.possible_roads[player.player_index * edge_num + edge_id] = 1
+            for edge_id in iter_bits(player.possible_ship_mask):
+                state.possible_ships[player.player_index * edge_num + edge_id] = 1
+
+        # 手札 ([プレイヤー * 5 + 種類] の枚数)
+        state.resources = array("h", [n for hand in game.hands for n in hand.resources])
+        state.resources_already_get = array("h", game.resources_already_get)
+        state.resources_to_get_by_plenty = array("h", game.resources_to_get_by_plenty)
+        state.developments = array("h", [n for hand in game.hands for n in hand.developments])
+        state.developments_got_now = array("h", [n for hand in game.hands for n in hand.developments_got_now])
+        state.developments_used = array("h", [n for hand in game.hands for n in hand.developments_used])
+        state.development_deck = bytes(game.developments)
+        state.piece_counts = array("h", [n for hand in game.hands for n in (hand.road_count, hand.ship_count, hand.town_count, hand.city_count)])
+        state.resource_nums_to_be_discarded = array("h", [hand.resource_num_to_be_discarded for hand in game.hands])
+        # 選択できるアクションはActionTypeのビットで持つ
+        state.possible_actions = array("h", [sum(1 << action_type for action_type in hand.possible_actions) for hand in game.hands])
+
+        state.crnt_state = game.crnt_state.value
+        state.crnt_player_index = game.crnt_player_index
+        state.thief_pos_index = game.thief_pos_index
+        state.is_trade_not_done = game.is_trade_not_done
+        state.is_development_used = game.is_development_used
+        state.max_knight_power_player, state.max_knight_power = game.max_knight_power_player if game.max_knight_power_player is not None else (NO_PLAYER, 0)
+        state.max_length_player = game.max_length_player if game.max_length_player is not None else NO_PLAYER
+        state.players_to_be_stolen = bytes(game.players_to_be_stolen)
+        return state
+
+    def clone(self):
+        """配列を全てコピーした複製を返す (bytesは変更されないので共有する)"""
+        state = GameState.__new__(GameState)
+        state.player_num = self.player_num
+        state.vertex_num = self.vertex_num
+        state.edge_num = self.edge_num
+        state.vertex_owners = self.vertex_owners[:]
+        state.vertex_levels = self.vertex_levels[:]
+        state.edge_owners = self.edge_owners[:]
+        state.possible_towns = self.possible_towns[:]
+        state.possible_roads = self.possible_roads[:]
+        state.possible_ships = self.possible_ships[:]
+        state.resources = self.resources[:]
+        state.resources_already_get = self.resources_already_get[:]
+        state.resources_to_get_by_plenty = self.resources_to_get_by_plenty[:]
+        state.developments = self.developments[:]
+        state.developments_got_now = self.developments_got_now[:]
+        state.developments_used = self.developments_used[:]
+        state.development_deck = self.development_deck
+        state.piece_counts = self.piece_counts[:]
+        state.resource_nums_to_be_discarded = self.resource_nums_to_be_discarded[:]
+        state.possible_actions = self.possible_actions[:]
+        state.crnt_state = self.crnt_state
+        state.crnt_player_index = self.crnt_player_index
+        state.thief_pos_index = self.thief_pos_index
+        state.is_trade_not_done = self.is_trade_not_done
+        state.is_development_used = self.is_development_used
+        state.max_knight_power_player = self.max_knight_power_player
+        state.max_knight_power = self.max_knight_power
+        state.max_length_player = self.max_length_player
+        state.players_to_be_stolen = self.players_to_be_stolen
+        return state
+
+    def __eq__(self, other: object):
+        if not isinstance(other, GameState):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def get_digest(self):
+        """全ての値から求めたCRC32 (リプレイの最後の状態が一致するかの確認に使う)"""
+        digest = 0
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if isinstance(value, array):
+                data = value.tobytes()
+            elif isinstance(value, (bytes, bytearray)):
+                data = bytes(value)
+            else:
+                data = repr(value).encode()
+            digest = zlib.crc32(data, digest)
+        return digest
+
+    def get_resources(self, player_index: int):
+        return self.resources[player_index * self.RESOURCE_NUM:(player_index + 1) * self.RESOURCE_NUM]
+
+    def apply_to(self, game: Game):
+        """この状態を、同じ盤面の配置を持つGameに書き戻す (Boardはそのまま描画し直せる)"""
+        topology = game.topology
+        vertex_num, edge_num = self.vertex_num, self.edge_num
+
+        game.towns_already_set = defaultdict(int)
+        game.cities_already_set = defaultdict(int)
+        batch_row = game.production.batch_row
+        game.production = ProductionTable(topology, game.resource_by_space, game.number_by_space, self.thief_pos_index)
+        game.longest_road = LongestRoad(self.player_num)
+        game.built_vertex_mask = 0
+        game.built_road_mask = 0
+        # 道は建物が全て置かれた後に加える (他のプレイヤーの建物の先にはつながらないようにする)
+        game.connectivity = NetworkConnectivity(topology, self.player_num)
+        for vertex_id, (player_index, level) in enumerate(zip(self.vertex_owners, self.vertex_levels)):
+            if level == 0:
+                continue
+            vertex = topology.vertices[vertex_id]
+            if level == 1:
+                game.towns_already_set[vertex] = player_index
+            else:
+                game.cities_already_set[vertex] = player_index
+            game.production.set_building(vertex_id, player_index, level)
+            game.built_vertex_mask |= 1 << vertex_id
+            game.connectivity.add_building(vertex_id, player_index)
+            game.longest_road.vertex_owner[vertex] = player_index
+        game.ways_already_set = defaultdict(int)
+        for edge_id, player_index in enumerate(self.edge_owners):
+            if player_index != NO_PLAYER:
+                game.ways_already_set[topology.edges[edge_id]] = player_index
+                game.longest_road.add_road(topology.edges[edge_id], player_index)
+                game.built_road_mask |= 1 << edge_id
+                game.connectivity.add_edge(edge_id, player_index)
+
+        for player in game.player_list:
+            offset = player.player_index * vertex_num
+            player.possible_town_mask = sum(1 << i for i in range(vertex_num) if self.possible_towns[offset + i])
+            offset = player.player_index * edge_num
+            player.possible_road_mask = sum(1 << i for i in range(edge_num) if self.possible_roads[offset + i])
+            player.possible_ship_mask = sum(1 << i for i in range(edge_num) if self.possible_ships[offset + i])
+
+        # 山札から取得済みの枚数は全ての手札と共有しているリストなので、中身だけを書き換える
+        game.resources_already_get[:] = self.resources_already_get
+        game.resources_to_get_by_plenty = list(self.resources_to_get_by_plenty)
+        game.developments = [DevelopmentCardType(development) for development in self.development_deck]
+        for player_index, hand in enumerate(game.hands):
+            resource_slice = slice(player_index * self.RESOURCE_NUM, (player_index + 1) * self.RESOURCE_NUM)
+            hand.resources = list(self.resources[resource_slice])
+            hand.developments = list(self.developments[resource_slice])
+            hand.developments_got_now = list(self.developments_got_now[resource_slice])
+            hand.developments_used = list(self.developments_used[resource_slice])
+            hand.road_count, hand.ship_count, hand.town_count, hand.city_count = self.piece_counts[player_index * self.PIECE_NUM:(player_index + 1) * self.PIECE_NUM]
+            hand.resource_num_to_be_discarded = self.resource_nums_to_be_discarded[player_index]
+            hand.possible_actions = [action_type for action_type in ActionType if self.possible_actions[player_index] >> action_type & 1]
+            hand.is_max_knight_power = player_index == self.max_knight_power_player
+            hand.is_max_length = player_index == self.max_length_player
+            hand.update_version()
+
+        game.crnt_state = BoardState(self.crnt_state)
+        game.crnt_player_index = self.crnt_player_index
+        game.thief_pos_index = self.thief_pos_index
+        game.is_trade_not_done = self.is_trade_not_done
+        game.is_development_used = self.is_development_used
+        game.max_knight_power_player = (self.max_knight_power_player, self.max_knight_power) if self.max_knight_power_player != NO_PLAYER else None
+        game.max_length_player = self.max_length_player if self.max_length_player != NO_PLAYER else None
+        game.players_to_be_stolen = list(self.players_to_be_stolen)
+
+        # BatchProductionとつながっていれば、その行も書き戻した状態で作り直す
+        if batch_row is not None:
+            batch_row[0].link_game(batch_row[1], game)
@@ -0,0 +1,125 @@
+from game import Game, BoardState
+from hand import ActionType
+from mcts import RandomPlayer, create_player_rng
+from moves import MoveType, MOVE_STRIDE
+from state import GameState
+from topology import iter_bits
+
+MAX_STEPS = 3000
+
+def play_random_game(seed: int, step_num: int = MAX_STEPS):
+    """ランダムなプレイヤーで進め、各アクションの前の対局を返す (同じGameを動かし続ける)"""
+    game = Game(seed)
+    player = RandomPlayer(create_player_rng(seed, 0))
+    for _ in range(step_num):
+        if game.get_winner() is not None:
+            break
+        yield game
+        game.apply_move(player.choose_move(game))
+
+def get_networks_by_bfs(game: Game, player_index: int):
+    """道・船と建物のつながりを幅優先探索で求め、(各ネットワークの辺のビットマスクのリスト, 道を伸ばせる頂点のビットマスク) を返す
+
+    他のプレイヤーの建物がある頂点では、道はつながらず伸ばせもしない
+    """
+    topology = game.topology
+    owners = {topology.vertex_ids[vertex]: owner for buildings in (game.towns_already_set, game.cities_already_set) for vertex, owner in buildings.items()}
+    edge_ids = {topology.edge_ids[edge] for edge, owner in game.ways_already_set.items() if owner == player_index}
+    building_ids = {vertex_id for vertex_id, owner in owners.items() if owner == player_index}
+
+    # 頂点を通り抜けられるなら、その頂点に接する自分の道と建物はつながる
+    def get_neighbors(vertex_id: int):
+        return [("edge", edge_id) for edge_id in topology.vertex_edges[vertex_id] if edge_id in edge_ids] + [("vertex", vertex_id)] * (vertex_id in building_ids)
+
+    networks = []
+    reach_mask = 0
+    visited = set()
+    for start in [("edge", edge_id) for edge_id in sorted(edge_ids)] + [("vertex", vertex_id) for vertex_id in sorted(building_ids)]:
+        if start in visited:
+            continue
+        visited.add(start)
+        queue = [start]
+        network_mask = 0
+        while queue:
+            node_type, node_id = queue.pop(0)
+            vertex_ids = topology.edge_vertices[node_id] if node_type == "edge" else (node_id,)
+            if node_type == "edge":
+                network_mask |= 1 << node_id
+            for vertex_id in vertex_ids:
+                if owners.get(vertex_id, player_index) != player_index:
+                    continue
+                reach_mask |= 1 << vertex_id
+                for neighbor in get_neighbors(vertex_id):
+                    if neighbor not in visited:
+                        visited.add(neighbor)
+                        queue.append(neighbor)
+        networks.append(network_mask)
+    return networks, reach_mask
+
+def test_undo_restores_every_legal_move():
+    # 選べるアクションは全て実行でき、取り消すと元の状態に戻る
+    for game in play_random_game(1, 1000):
+        game.start_recording_undo()
+        digest = GameState.from_game(game).get_digest()
+        for move in game.get_legal_moves():
+            mark = game.get_undo_mark()
+            assert game.apply_move(move), move
+            game.undo_to(mark)
+            assert GameState.from_game(game).get_digest() == digest, move
+        game.stop_recording_undo()
+
+def test_state_round_trip():
+    # 途中の状態を書き戻すと、同じ状態と、同じ候補・最長経路・ネットワークになる
+    states = []
+    for step, game in enumerate(play_random_game(2)):
+        if step % 100 == 0:
+            states.append((GameState.from_game(game), game.get_legal_moves(), list(game.longest_road.lengths), list(game.connectivity.reach_masks)))
+    for state, legal_moves, longest_road_lengths, reach_masks in states:
+        state.apply_to(game)
+        assert GameState.from_game(game) == state
+        assert GameState.from_game(game).get_digest() == state.get_digest()
+        assert game.get_legal_moves() == legal_moves
+        assert game.longest_road.lengths == longest_road_lengths
+        assert game.connectivity.reach_masks == reach_masks
+
+def test_longest_road_matches_full_search():
+    for step, game in enumerate(play_random_game(8)):
+        assert game.longest_road.lengths == game.get_longest_road_lengths()
+        if step % 1000:
+            continue
+        # 対局ではまれな、他のプレイヤーの開拓地で道が分断される場合も、全ての頂点で試す
+        longest_road = game.longest_road
+        for vertex in game.topology.vertices:
+            if vertex in longest_road.vertex_owner:
+                continue
+            for player_index in range(Game.PLAYER_NUM):
+                if any(vertex in longest_road.adjacency[other_index] for other_index in range(Game.PLAYER_NUM) if other_index != player_index):
+                    game.towns_already_set[vertex] = player_index
+                    longest_road.add_settlement(vertex, player_index)
+                    assert longest_road.lengths == game.get_longest_road_lengths()
+                    longest_road.remove_settlement(vertex)
+                    del game.towns_already_set[vertex]
+                    assert longest_road.lengths == game.get_longest_road_lengths()
+
+def test_connectivity_matches_bfs():
+    for game in play_random_game(8):
+        for player_index in range(Game.PLAYER_NUM):
+            networks, reach_mask = get_networks_by_bfs(game, player_index)
+            assert game.connectivity.reach_masks[player_index] == reach_mask
+            assert game.connectivity.get_network_num(player_index) == len(networks)
+            for network_mask in networks:
+                for edge_id in iter_bits(network_mask):
+                    assert game.connectivity.get_network(player_index, edge_id) == network_mask
+
+def test_trade_is_offered_once_per_turn():
+    # 相手が見つからず成立しなくても、同じターンにもう一度交渉はできない
+    game = Game(0)
+    player = RandomPlayer(create_player_rng(0, 0))
+    for _ in range(MAX_STEPS):
+        if game.crnt_state == BoardState.ACTION and ActionType.TRADE in game.hands[game.crnt_player_index].possible_actions:
+            break
+        game.apply_move(player.choose_move(game))
+    assert game.apply_move(MoveType.SELECT_ACTION * MOVE_STRIDE + ActionType.TRADE)
+    assert game.apply_move(game.get_legal_moves()[0])
+    assert game.crnt_state == BoardState.ACTION
+    assert MoveType.SELECT_ACTION * MOVE_STRIDE + ActionType.TRADE not in game.get_legal_moves()
@@ -0,0 +1,66 @@
+from game import Game, BoardState
+from mcts import MCTSPlayer, create_player_rng, create_dices_rng, roll_dices
+from moves import MOVE_STRIDE, REPLAY_ARG_NUMS, DICE_PROBABILITIES, ReplayOp
+from selfplay import play_game
+
+def get_dices_results(replay_log: bytes):
+    """リプレイのログから、サイコロの出目を順に取り出す"""
+    dices_results = []
+    position = 0
+    while position < len(replay_log):
+        replay_op = replay_log[position]
+        if replay_op == ReplayOp.RESOLVE_DICE:
+            dices_results.append(replay_log[position + 1])
+        position += 1 + REPLAY_ARG_NUMS[replay_op]
+    return dices_results
+
+def test_mcts_game_rolls_fair_dices():
+    # MCTSのプレイヤーが出目を選ぶのではなく、対局のシードから作った乱数で振った出目になる
+    seed = 7
+    result = play_game(seed, ["mcts"] * Game.PLAYER_NUM, 1, None, max_steps=600, is_recording=True)
+    dices_results = get_dices_results(result["record"].actions)
+    dices_rng = create_dices_rng(seed)
+    assert dices_results == [roll_dices(dices_rng) % MOVE_STRIDE for _ in dices_results]
+
+    # 出目の分布が確率から大きく外れていない (自由度10のカイ二乗分布の上側0.1%点)
+    roll_num = len(dices_results)
+    chi_square = sum(
+        (dices_results.count(dices_result) - roll_num * probability) ** 2 / (roll_num * probability)
+        for dices_result, probability in DICE_PROBABILITIES.items()
+    )
+    assert roll_num >= 50
+    assert chi_square < 29.6
+
+def test_mcts_player_does_not_search_dices():
+    game = Game(0)
+    while game.crnt_state != BoardState.ROLLDICE:
+        game.apply_move(game.get_legal_moves()[0])
+    player = MCTSPlayer(game.crnt_player_index, playout_num=1)
+    player.choose_move(game)
+    assert player.last_playout_num == 0
+
+def get_action_game(seed: int):
+    """初期配置を終えて、最初にサイコロを振った後の対局"""
+    game = Game(seed)
+    while game.crnt_state != BoardState.ROLLDICE:
+        game.apply_move(game.get_legal_moves()[0])
+    game.apply_move(roll_dices(create_dices_rng(seed)))
+    return game
+
+def test_mcts_does_not_see_hidden_information():
+    # 山札の順番と対局の乱数だけが違う2つの対局で、探索の結果が同じになる
+    games = [get_action_game(3), get_action_game(3)]
+    games[1].developments.reverse()
+    games[1].rng.random()
+
+    search_results = []
+    for game in games:
+        developments = list(game.developments)
+        rng_state = game.rng.getstate()
+        player = MCTSPlayer(game.crnt_player_index, playout_num=30, rng=create_player_rng(0, game.crnt_player_index))
+        move = player.choose_move(game)
+        search_results.append((move, player.root.visit_count, player.root.total_reward))
+        # 探索の後は、元の山札と乱数に戻っている
+        assert game.developments == developments
+        assert game.rng.getstate() == rng_state
+    assert search_results[0] == search_results[1]
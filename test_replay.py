@@ -0,0 +1,69 @@
+import argparse
+import os
+import random
+import pytest
+from batch_production import BatchProduction, resolve_dice_batch
+from game import Game, BoardState
+from mcts import RandomPlayer, create_player_rng
+from moves import MOVE_STRIDE, REPLAY_ARG_NUMS, ReplayOp
+from replay import ReplayFile, parse_seed, replay
+from selfplay import play_game
+from state import GameState
+
+GAME_NUM = 8
+MAX_STEPS = 3000
+
+def play_games_with_batch(seeds: list[int]):
+    """サイコロの出目だけをresolve_dice_batchでまとめて反映しながら、複数の対局を進める"""
+    games = [Game(seed) for seed in seeds]
+    for game in games:
+        game.start_recording_replay()
+    batch_production = BatchProduction.from_games(games)
+    player = RandomPlayer(create_player_rng(seeds[0], 0))
+    for _ in range(MAX_STEPS):
+        game_indexes = []
+        dices_results = []
+        for game_index, game in enumerate(games):
+            if game.get_winner() is not None:
+                continue
+            move = player.choose_move(game)
+            if game.crnt_state == BoardState.ROLLDICE:
+                game_indexes.append(game_index)
+                dices_results.append(move % MOVE_STRIDE)
+            else:
+                game.apply_move(move)
+        if game_indexes:
+            resolve_dice_batch(batch_production, game_indexes, dices_results)
+    return games
+
+def test_batch_stepped_games_replay():
+    seeds = list(range(GAME_NUM))
+    for seed, game in zip(seeds, play_games_with_batch(seeds)):
+        replayed_game, _ = replay(seed, bytes(game.replay_log))
+        assert GameState.from_game(replayed_game).get_digest() == GameState.from_game(game).get_digest()
+
+def test_play_game_is_reproducible(tmp_path):
+    # 他の処理がグローバルなrandomを進めても、同じシードの対局は同じリプレイになる
+    replays = []
+    for i in range(2):
+        random.random()
+        replay_dir = tmp_path / str(i)
+        os.makedirs(replay_dir)
+        play_game(3, ["random"] * Game.PLAYER_NUM, None, None, replay_dir=str(replay_dir))
+        replays.append(ReplayFile.load(str(replay_dir / "3.catr")))
+    assert replays[0] == replays[1]
+
+def test_trade_out_of_state_is_not_replayed():
+    # 初期配置の途中 (交渉の状態ではない所) の交渉は再生できない
+    replay_log = bytes([ReplayOp.TRADE] + [0] * REPLAY_ARG_NUMS[ReplayOp.TRADE])
+    with pytest.raises(ValueError, match="could not be replayed"):
+        replay(5, replay_log)
+
+def test_seed_must_fit_in_the_header(tmp_path):
+    # ヘッダに保存できないシードは、コマンドライン引数の時点で弾く
+    for value in ("-1", str(2**64)):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_seed(value)
+    game = Game(parse_seed(str(2**64 - 1)))
+    ReplayFile.save(str(tmp_path / "max_seed.catr"), game)
+    assert ReplayFile.load(str(tmp_path / "max_seed.catr"))[0] == 2**64 - 1
@@ -0,0 +1,31 @@
+from collections import OrderedDict
+import pygame
+
+class TextCache:
+    """(フォント, 文字列, 色, アンチエイリアス) をキーにした、描画済み文字のLRUキャッシュ"""
+    MAX_SIZE = 512
+
+    _cache: OrderedDict[tuple[pygame.font.Font, str, tuple[int, ...], bool], pygame.Surface] = OrderedDict()
+    hits: int = 0
+    misses: int = 0
+
+    @classmethod
+    def render(cls, font: pygame.font.Font, text: str, antialias: bool, color: tuple[int, ...]) -> pygame.Surface:
+        """font.renderと同じ引数で呼べる (返すSurfaceは共有されるので書き換えないこと)"""
+        key = (font, text, tuple(color), antialias)
+        if (surf := cls._cache.get(key)) is not None:
+            cls._cache.move_to_end(key)
+            cls.hits += 1
+            return surf
+
+        cls.misses += 1
+        surf = font.render(text, antialias, color)
+        cls._cache[key] = surf
+        if len(cls._cache) > cls.MAX_SIZE:
+            cls._cache.popitem(last=False)
+        return surf
+
+    @classmethod
+    def reset_counters(cls):
+        cls.hits = 0
+        cls.misses = 0
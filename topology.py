@@ -0,0 +1,60 @@
+Vertex = tuple[int,int]
+Edge = tuple[Vertex, Vertex]
+
+def iter_bits(mask: int):
+    """ビットマスクの立っているビットの位置 (頂点ID・辺ID) を小さい順に返す"""
+    while mask:
+        low_bit = mask & -mask
+        yield low_bit.bit_length() - 1
+        mask ^= low_bit
+
+class BoardTopology:
+    """盤面の頂点・辺・マスの隣接関係を整数IDで引ける表 (盤面の生成時に一度だけ作る)"""
+
+    def __init__(self, space_pos: tuple[tuple[int,int], ...], vertex_dir: tuple[tuple[int,int], ...], edges: list[Edge]):
+        self.vertices: list[Vertex] = sorted({(sx+dx, sy+dy) for sx, sy in space_pos for dx, dy in vertex_dir})
+        self.vertex_ids: dict[Vertex, int] = {vertex: i for i, vertex in enumerate(self.vertices)}
+
+        # 辺は y 座標の小さい頂点を先頭にした形で持つ (Gameの辞書のキーと同じ形)
+        self.edges: list[Edge] = sorted(edges)
+        self.edge_ids: dict[Edge, int] = {edge: i for i, edge in enumerate(self.edges)}
+        self.edge_vertices: list[tuple[int,int]] = [(self.vertex_ids[v1], self.vertex_ids[v2]) for v1, v2 in self.edges]
+
+        vertex_edges: list[list[int]] = [[] for _ in self.vertices]
+        vertex_neighbors: list[list[int]] = [[] for _ in self.vertices]
+        for edge_id, (v1, v2) in enumerate(self.edge_vertices):
+            vertex_edges[v1].append(edge_id)
+            vertex_edges[v2].append(edge_id)
+            vertex_neighbors[v1].append(v2)
+            vertex_neighbors[v2].append(v1)
+        self.vertex_edges: list[tuple[int, ...]] = [tuple(edge_ids) for edge_ids in vertex_edges]
+        self.vertex_neighbors: list[tuple[int, ...]] = [tuple(vertex_ids) for vertex_ids in vertex_neighbors]
+
+        self.hex_vertices: list[tuple[int, ...]] = [tuple(self.vertex_ids[(sx+dx, sy+dy)] for dx, dy in vertex_dir) for sx, sy in space_pos]
+        vertex_hexes: list[list[int]] = [[] for _ in self.vertices]
+        for hex_id, vertex_ids in enumerate(self.hex_vertices):
+            for vertex_id in vertex_ids:
+                vertex_hexes[vertex_id].append(hex_id)
+        self.vertex_hexes: list[tuple[int, ...]] = [tuple(hex_ids) for hex_ids in vertex_hexes]
+
+        # 頂点ID・辺IDをビットの位置にしたマスクで表した隣接関係 (配置できる場所の候補の更新に使う)
+        self.all_vertex_mask = (1 << len(self.vertices)) - 1
+        # 頂点に接する辺
+        self.vertex_edge_masks: list[int] = [sum(1 << edge_id for edge_id in edge_ids) for edge_ids in self.vertex_edges]
+        # 距離ルールで、この頂点に開拓地があると置けなくなる頂点 (自身と隣の頂点)
+        self.vertex_block_masks: list[int] = [1 << vertex_id | sum(1 << neighbor_id for neighbor_id in neighbor_ids) for vertex_id, neighbor_ids in enumerate(self.vertex_neighbors)]
+
+        # 盤面の状態は座標をキーにしているので、座標からも同じ表を引けるようにしておく
+        self.neighbors_by_vertex: dict[Vertex, tuple[tuple[Vertex, Edge], ...]] = {
+            vertex: tuple((self.vertices[neighbor_id], self.edges[edge_id]) for neighbor_id, edge_id in zip(self.vertex_neighbors[vertex_id], self.vertex_edges[vertex_id]))
+            for vertex_id, vertex in enumerate(self.vertices)
+        }
+        self.vertices_by_hex: list[tuple[Vertex, ...]] = [tuple(self.vertices[vertex_id] for vertex_id in vertex_ids) for vertex_ids in self.hex_vertices]
+
+    def get_vertices(self, vertex_mask: int):
+        """頂点のマスク → 頂点の座標のリスト"""
+        return [self.vertices[vertex_id] for vertex_id in iter_bits(vertex_mask)]
+
+    def get_edges(self, edge_mask: int):
+        """辺のマスク → 辺の座標のリスト"""
+        return [self.edges[edge_id] for edge_id in iter_bits(edge_mask)]